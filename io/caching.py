@@ -0,0 +1,125 @@
+"""
+A least recently used cache with a size budget, which can spill evicted
+entries to a shelve database and read them back, so that a cache can be
+larger than memory and shared between runs.
+
+Classes:
+
+    SpillingCache
+"""
+
+import shelve
+from collections import OrderedDict
+
+from .io import format_filename
+
+
+class SpillingCache():
+    """
+    A least recently used cache mapping hashable keys to values. Entries
+    are evicted while the total of their sizes, as given by entry_size,
+    exceeds max_size. If file_name is given, evicted entries are written
+    to a shelve database with that name, which is also searched on a
+    miss, and every entry in memory is written to it on close. Entries
+    read from the database are not written to it again.
+
+    The numbers of lookups answered from memory and from disk, and of
+    lookups that missed, are counted in hits, disk_hits, and misses.
+
+    Methods:
+        entry_size, lookup, store, evict, statistics, close
+    """
+
+    def __init__(self, max_size, file_name=None):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        # Maps each key to the size of its entry and whether it
+        # needs to be written to disk.
+        self.entry_sizes = {}
+        self.size = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if file_name is not None:
+            self.shelf = shelve.open(format_filename(file_name))
+        else:
+            self.shelf = None
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.close()
+
+    def entry_size(self, key, value):
+        """Returns the size of an entry, 1 unless overridden."""
+        return 1
+
+    def lookup(self, key):
+        """
+        Returns a boolean indicating whether a value is stored under key,
+        and the value, or None if there is none.
+        """
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return True, self.entries[key]
+        if self.shelf is not None:
+            shelf_key = repr(key)
+            if shelf_key in self.shelf:
+                self.disk_hits += 1
+                value = self.shelf[shelf_key]
+                self.store(key, value, spill=False)
+                return True, value
+        self.misses += 1
+        return False, None
+
+    def store(self, key, value, spill=True):
+        """
+        Stores value under key, evicting least recently used entries
+        while the total size exceeds max_size. If spill = False, the
+        entry is not written to disk, e.g. since it was read from disk.
+        """
+        if key in self.entries:
+            self.size -= self.entry_sizes[key][0]
+        size = self.entry_size(key, value)
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        self.entry_sizes[key] = (size, spill)
+        self.size += size
+        while self.size > self.max_size and self.entries:
+            self.evict()
+
+    def evict(self):
+        key, value = self.entries.popitem(last=False)
+        size, spill = self.entry_sizes.pop(key)
+        self.size -= size
+        self.evictions += 1
+        if self.shelf is not None and spill:
+            self.shelf[repr(key)] = value
+
+    def statistics(self):
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "size": self.size,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": ((self.hits + self.disk_hits) / lookups
+                         if lookups else 0.0),
+        }
+
+    def close(self):
+        """Writes every entry in memory to disk, if used, and closes."""
+        if self.shelf is not None:
+            for key, value in self.entries.items():
+                if self.entry_sizes[key][1]:
+                    self.shelf[repr(key)] = value
+            self.shelf.close()
+            self.shelf = None
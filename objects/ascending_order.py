@@ -3,58 +3,135 @@ Utility functions for handling words in ascending order.
 
 Functions:
 
-    convert_to_ascending_order
+    ascending_order_string, convert_to_ascending_order,
+    convert_word_array_to_ascending_order
 """
 
-from .objects import Word
+import numpy as np
 
+from .objects import Word, intern_word
+from .compact import LETTERS, PAD, WordArray
 
-def convert_to_ascending_order(word_collection, optimize=True):
+
+# The ith letter of a word in ascending order is ASCENDING_LETTERS[i].
+ASCENDING_LETTERS = "123456789" + "".join(chr(97+i) for i in range(256))
+
+
+def ascending_order_string(word_string):
+    """
+    Args:
+        word_string: String or instance of Word.
+    Returns:
+        The string obtained from word_string by relabeling its letters
+        1, 2, ..., 9, a, b, ... in order of first occurrence.
+    """
+    letters = "".join(dict.fromkeys(word_string))
+    if len(letters) <= len(ASCENDING_LETTERS):
+        new_letters = ASCENDING_LETTERS[:len(letters)]
+    else:
+        new_letters = ASCENDING_LETTERS + "".join(
+            chr(88+i) for i in range(len(ASCENDING_LETTERS), len(letters)))
+    return str(word_string).translate(str.maketrans(letters, new_letters))
+
+
+def convert_to_ascending_order(word_collection, optimize=True,
+                               in_place=False):
     """
     Args:
-        word_collection: Container for instance(s) of Word, 
-            can be an instance of Word or a string, or a list, tuple, set, 
-            or dictionary that contain other word collections or words. 
+        word_collection: Container for instance(s) of Word,
+            can be an instance of Word or a string, an instance of
+            WordArray, or a list, tuple, set, or dictionary that
+            contain other word collections or words.
+        optimize: Boolean, defaults to True. Passed to the constructor
+            of each converted instance of Word.
+        in_place: Boolean, defaults to False. If True, sets,
+            dictionaries, and instances of WordArray are modified in place
+            instead of copied (lists are always modified in place).
     Returns:
-        A copy of word_collection with every word 
-        converted to ascending order.
+        A copy of word_collection with every word
+        converted to ascending order, or word_collection itself
+        if in_place = True.
     """
     collection_type = type(word_collection)
     if collection_type == dict:
-        converted_collection = {}
-        for key in word_collection:
+        if in_place:
+            items = list(word_collection.items())
+            word_collection.clear()
+            converted_collection = word_collection
+        else:
+            items = word_collection.items()
+            converted_collection = {}
+        for key, value in items:
             if type(key) == Word:
-                key = convert_to_ascending_order(key)
-            converted_value = convert_to_ascending_order(word_collection[key])
+                key = convert_to_ascending_order(key, optimize)
+            converted_value = convert_to_ascending_order(
+                value, optimize, in_place)
             converted_collection[key] = converted_value
         return converted_collection
     elif collection_type == list:
         for i, element in enumerate(word_collection):
-            word_collection[i] = convert_to_ascending_order(element)
+            word_collection[i] = convert_to_ascending_order(
+                element, optimize, in_place)
         return word_collection
     elif collection_type == tuple:
-        return tuple(convert_to_ascending_order(list(word_collection)))
+        return tuple(convert_to_ascending_order(
+            list(word_collection), optimize, in_place))
     elif collection_type == set:
-        return set(convert_to_ascending_order(list(word_collection)))
-    elif collection_type == Word or collection_type == str:
-        translation = {}
-        new_word = ""
-        for char in word_collection:
-            try:
-                new_letter = translation[char]
-            except KeyError:
-                if len(translation) < 9:
-                    new_letter = str(len(translation)+1)
-                else:
-                    offset = len(translation) - 9
-                    new_letter = chr(97 + offset)
-                translation[char] = new_letter
-            finally:
-                new_word += new_letter
-        if collection_type == Word:
-            return Word(new_word, double_occurrence=False, 
-                        ascending_order=True, optimize=optimize)
-        elif collection_type == str:
-            return new_word
+        converted_elements = convert_to_ascending_order(
+            list(word_collection), optimize, in_place)
+        if in_place:
+            word_collection.clear()
+            word_collection.update(converted_elements)
+            return word_collection
+        return set(converted_elements)
+    elif collection_type == Word:
+        return intern_word(ascending_order_string(word_collection),
+                           double_occurrence=False, ascending_order=True,
+                           optimize=optimize)
+    elif collection_type == str:
+        return ascending_order_string(word_collection)
+    elif collection_type == WordArray:
+        return convert_word_array_to_ascending_order(
+            word_collection, in_place=in_place)
     else:
         raise TypeError("Invalid word collection type!")
+
+
+def convert_word_array_to_ascending_order(word_array, in_place=False,
+                                          chunk_size=65536):
+    """
+    Args:
+        word_array: Instance of WordArray.
+        in_place: Boolean, defaults to False. If True, the codes of
+            word_array are overwritten.
+        chunk_size: Integer, defaults to 65536. Number of words
+            converted at a time.
+    Returns:
+        An instance of WordArray containing the words of word_array
+        converted to ascending order. Each letter is relabeled by the
+        number of distinct letters preceding its first occurrence,
+        computed for a whole chunk of words with array operations.
+    """
+    codes = word_array.codes if in_place else word_array.codes.copy()
+    alphabet_size = len(LETTERS)
+    for start in range(0, len(codes), chunk_size):
+        chunk = codes[start:start+chunk_size]
+        padding = chunk == PAD
+        # Padding is treated as an extra letter, which always occurs last.
+        letters = np.where(padding, alphabet_size, chunk).astype(np.intp)
+        rows = np.broadcast_to(
+            np.arange(len(chunk))[:, np.newaxis], chunk.shape)
+        positions = np.broadcast_to(
+            np.arange(chunk.shape[1])[np.newaxis, :], chunk.shape)
+        first_positions = np.full((len(chunk), alphabet_size+1),
+                                  chunk.shape[1], dtype=np.intp)
+        np.minimum.at(first_positions, (rows, letters), positions)
+        order = np.argsort(first_positions, axis=1, kind="stable")
+        ranks = np.empty_like(order)
+        np.put_along_axis(ranks, order, np.broadcast_to(
+            np.arange(alphabet_size+1)[np.newaxis, :], order.shape), axis=1)
+        new_codes = np.take_along_axis(ranks, letters, axis=1)
+        chunk[...] = np.where(padding, PAD, new_codes)
+    if in_place:
+        return word_array
+    return WordArray(codes, word_array.lengths.copy())
@@ -0,0 +1,49 @@
+"""
+Simple timing benchmarks for the objects API.
+
+Usage:
+
+    $ python -m word_explorer.objects.benchmarks
+
+Functions:
+
+    benchmark_dow_generation
+"""
+
+from time import time
+
+from .list_words import get_dows, generate_ascending_dows
+
+
+def benchmark_dow_generation(max_size):
+    """
+    Args:
+        max_size: Integer.
+    Returns:
+        A dictionary containing the running times of get_dows and 
+        generate_ascending_dows for generating all ascending order double 
+        occurrence words of size at most max_size. Raises an AssertionError 
+        if the two word lists differ.
+    """
+    start_time = time()
+    word_list = get_dows(max_size)
+    permutation_time = time() - start_time
+
+    start_time = time()
+    generated_word_list = [word for size in range(1, max_size+1) 
+                           for word in generate_ascending_dows(size)]
+    generator_time = time() - start_time
+
+    assert word_list == generated_word_list
+    return {"get_dows": permutation_time, 
+            "generate_ascending_dows": generator_time,
+            "speedup": permutation_time / generator_time}
+
+
+if __name__ == '__main__':
+    for max_size in range(1, 6):
+        times = benchmark_dow_generation(max_size)
+        print("Max size", str(max_size) + ":", "get_dows", 
+              round(times["get_dows"], 4), "s, generate_ascending_dows", 
+              round(times["generate_ascending_dows"], 4), "s, speedup", 
+              round(times["speedup"], 2))
@@ -0,0 +1,305 @@
+"""
+Compact representations of words for storing large word lists.
+
+Letters are encoded as the small integers 0, 1, ..., 34 following the
+order of LETTERS, so that e.g. the word 1212 is encoded as the bytes
+(0, 1, 0, 1). Since LETTERS is sorted, comparing encoded words
+is equivalent to comparing the original strings.
+
+Classes:
+
+    CompactWord, WordArray
+
+Functions:
+
+    encode_word, decode_word, prefix_parity_array, irreducible_mask, 
+    strongly_irreducible_mask
+"""
+
+import numpy as np
+
+from .objects import Word
+
+
+LETTERS = "123456789abcdefghijklmnopqrstuvwxyz"
+PAD = 255   # Code used for padding the rows of a WordArray
+
+_ENCODING_TABLE = str.maketrans(
+    LETTERS, "".join(chr(code) for code in range(len(LETTERS))))
+_DECODING_TABLE = str.maketrans(
+    "".join(chr(code) for code in range(len(LETTERS))), LETTERS)
+
+
+def encode_word(word):
+    """
+    Args:
+        word: String or instance of Word, containing only letters in LETTERS.
+    Returns:
+        A bytes object containing the code of each letter of word.
+    """
+    try:
+        codes = str(word).translate(_ENCODING_TABLE).encode("latin-1")
+    except UnicodeEncodeError:
+        codes = None
+    if codes is None or (codes and max(codes) >= len(LETTERS)):
+        raise ValueError("Word contains a letter that cannot be encoded!")
+    return codes
+
+
+def decode_word(codes):
+    """
+    Args:
+        codes: Bytes or iterable of integers, the letter codes of a word.
+    Returns:
+        The word as a string.
+    """
+    return bytes(codes).decode("latin-1").translate(_DECODING_TABLE)
+
+
+class CompactWord():
+    """
+    A lightweight, immutable word that stores its letters as a bytes
+    object of letter codes. Uses __slots__, so no per-instance
+    dictionary is allocated.
+
+    Methods:
+        to_word
+    """
+    __slots__ = ("codes",)
+
+    def __init__(self, content):
+        if isinstance(content, (bytes, bytearray)):
+            self.codes = bytes(content)
+        else:
+            self.codes = encode_word(content)
+
+    def __str__(self):
+        return decode_word(self.codes)
+
+    def __repr__(self):
+        return "CompactWord(" + repr(str(self)) + ")"
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __eq__(self, other):
+        if isinstance(other, CompactWord):
+            return self.codes == other.codes
+        return str(self) == other
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __lt__(self, other):
+        return self.codes < other.codes
+
+    def __hash__(self):
+        return hash(self.codes)
+
+    @property
+    def size(self):
+        return len(self.codes) // 2
+
+    def to_word(self, **kwargs):
+        """Returns an instance of Word, passing kwargs to its constructor."""
+        return Word(str(self), **kwargs)
+
+
+class WordArray():
+    """
+    A columnar container storing a list of words in one contiguous
+    NumPy buffer. Row i of codes contains the letter codes of the ith word,
+    padded with PAD, and lengths[i] is the length of the ith word.
+
+    Methods:
+        from_words, from_codes, concatenate, load, save, words, to_words,
+        strings
+    """
+
+    def __init__(self, codes=None, lengths=None, max_length=0):
+        if codes is None:
+            codes = np.full((0, max_length), PAD, dtype=np.uint8)
+        if lengths is None:
+            lengths = np.count_nonzero(codes != PAD, axis=1)
+        self.codes = np.ascontiguousarray(codes, dtype=np.uint8)
+        self.lengths = np.asarray(lengths, dtype=np.uint16)
+
+    def __len__(self):
+        return self.codes.shape[0]
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            return CompactWord(
+                self.codes[index, :self.lengths[index]].tobytes())
+        else:
+            return WordArray(self.codes[index], self.lengths[index])
+
+    def __iter__(self):
+        for row, length in zip(self.codes, self.lengths):
+            yield CompactWord(row[:length].tobytes())
+
+    def __repr__(self):
+        return ("WordArray(" + str(len(self)) + " words, max length "
+                + str(self.max_length) + ")")
+
+    @property
+    def max_length(self):
+        return self.codes.shape[1]
+
+    @property
+    def sizes(self):
+        return self.lengths // 2
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + self.lengths.nbytes
+
+    @classmethod
+    def from_words(cls, words, max_length=None, chunk_size=65536):
+        """
+        Args:
+            words: Iterable containing strings, instances of Word,
+                or instances of CompactWord.
+            max_length: Integer, defaults to None. If None, the maximum
+                length of the words is used.
+            chunk_size: Integer, defaults to 65536. Number of words
+                encoded at a time.
+        Returns:
+            An instance of WordArray containing words in the same order.
+            Each chunk is packed as soon as it is encoded, so words can 
+            be streamed from a generator without holding them in memory.
+        """
+        arrays = []
+        chunk = []
+        for word in words:
+            chunk.append(word.codes if isinstance(word, CompactWord)
+                         else encode_word(word))
+            if len(chunk) == chunk_size:
+                arrays.append(cls.from_codes(chunk, max_length))
+                chunk = []
+        if chunk or not arrays:
+            arrays.append(cls.from_codes(chunk, max_length))
+        return cls.concatenate(arrays)
+
+    @classmethod
+    def from_codes(cls, word_codes, max_length=None):
+        """
+        Returns an instance of WordArray containing the words with 
+        the encodings (see encode_word) in the list word_codes.
+        """
+        if max_length is None:
+            max_length = max(map(len, word_codes), default=0)
+        codes = np.full((len(word_codes), max_length), PAD, dtype=np.uint8)
+        lengths = np.zeros(len(word_codes), dtype=np.uint16)
+        for i, encoded_word in enumerate(word_codes):
+            if len(encoded_word) > max_length:
+                raise ValueError("Word longer than max_length!")
+            codes[i, :len(encoded_word)] = np.frombuffer(
+                encoded_word, dtype=np.uint8)
+            lengths[i] = len(encoded_word)
+        return cls(codes, lengths)
+
+    @classmethod
+    def concatenate(cls, word_arrays):
+        """Concatenates a list of instances of WordArray, in order."""
+        word_arrays = list(word_arrays)
+        max_length = max((word_array.max_length for word_array
+                          in word_arrays), default=0)
+        if len(word_arrays) == 1:
+            return word_arrays[0]
+        codes = np.full((sum(len(word_array) for word_array in word_arrays),
+                         max_length), PAD, dtype=np.uint8)
+        start = 0
+        for word_array in word_arrays:
+            codes[start:start+len(word_array),
+                  :word_array.max_length] = word_array.codes
+            start += len(word_array)
+        lengths = np.concatenate(
+            [word_array.lengths for word_array in word_arrays]
+            + [np.zeros(0, dtype=np.uint16)])
+        return cls(codes, lengths)
+
+    @classmethod
+    def load(cls, file_name):
+        with np.load(file_name) as data:
+            return cls(data["codes"], data["lengths"])
+
+    def save(self, file_name):
+        np.savez(file_name, codes=self.codes, lengths=self.lengths)
+
+    def words(self, **kwargs):
+        """Yields an instance of Word for each word, passing kwargs to Word."""
+        for compact_word in self:
+            yield compact_word.to_word(**kwargs)
+
+    def to_words(self, **kwargs):
+        return list(self.words(**kwargs))
+
+    def strings(self):
+        for compact_word in self:
+            yield str(compact_word)
+
+
+def prefix_parity_array(word_array):
+    """
+    Returns a 2D array whose (i, j) entry is the prefix parity bitmask 
+    (see objects.prefix_parities) of the first j letters of the ith word 
+    of word_array, for j = 0, 1, ..., word_array.max_length.
+    """
+    codes = word_array.codes
+    bits = np.left_shift(np.uint64(1), codes.astype(np.uint64) 
+                         % np.uint64(64))
+    bits[codes == PAD] = 0
+    parities = np.zeros((len(word_array), word_array.max_length + 1), 
+                        dtype=np.uint64)
+    np.bitwise_xor.accumulate(bits, axis=1, out=parities[:, 1:])
+    return parities
+
+
+def irreducible_mask(word_array, chunk_size=65536):
+    """
+    Args:
+        word_array: Instance of WordArray containing double occurrence words.
+        chunk_size: Integer, defaults to 65536. Number of words 
+            processed at a time.
+    Returns:
+        A boolean array whose ith entry indicates whether the ith word 
+        of word_array is irreducible.
+    """
+    mask = np.zeros(len(word_array), dtype=bool)
+    for start in range(0, len(word_array), chunk_size):
+        chunk = word_array[start:start+chunk_size]
+        parities = prefix_parity_array(chunk)
+        lengths = chunk.lengths.astype(np.int64)[:, np.newaxis]
+        columns = np.arange(parities.shape[1])[np.newaxis, :]
+        proper_prefixes = (columns >= 1) & (columns <= lengths - 2)
+        mask[start:start+chunk_size] = ~np.any(
+            (parities == 0) & proper_prefixes, axis=1)
+    return mask
+
+
+def strongly_irreducible_mask(word_array, chunk_size=65536):
+    """
+    Args:
+        word_array: Instance of WordArray containing double occurrence words.
+        chunk_size: Integer, defaults to 65536. Number of words 
+            processed at a time.
+    Returns:
+        A boolean array whose ith entry indicates whether the ith word 
+        of word_array is strongly irreducible.
+    """
+    mask = np.zeros(len(word_array), dtype=bool)
+    for start in range(0, len(word_array), chunk_size):
+        chunk = word_array[start:start+chunk_size]
+        parities = prefix_parity_array(chunk)
+        lengths = chunk.lengths.astype(np.int64)[:, np.newaxis]
+        columns = np.arange(parities.shape[1])[np.newaxis, :]
+        # Replace the parities of the full word and the padding with 
+        # distinct values that cannot occur as parities, then look for 
+        # repeated parities among the remaining ones.
+        sentinels = np.uint64(1 << 63) + columns.astype(np.uint64)
+        parities = np.where(columns < lengths, parities, sentinels)
+        parities.sort(axis=1)
+        mask[start:start+chunk_size] = ~np.any(
+            parities[:, 1:] == parities[:, :-1], axis=1)
+    return mask
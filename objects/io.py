@@ -4,11 +4,15 @@ lists of words.
 
 Functions:
 
-    get_word_filename, store_words, retrieve_words
+    get_word_filename, store_words, stream_words, iterate_word_shards, 
+    retrieve_words, store_word_array, retrieve_word_array
 """
 
-from .objects import max_word_size, max_word_length, Word
-from word_explorer.io import store_data, retrieve_data
+import re
+
+from .objects import max_word_size, max_word_length, Word, intern_word
+from .compact import WordArray
+from word_explorer.io import store_data, retrieve_data, format_filename
 
 
 def get_word_filename(list_type, size=None, length=None, extra_suffix=""):
@@ -31,14 +35,67 @@ def store_words(word_list, list_type="dow", extra_suffix=""):
     store_data(word_list, file_name)
 
 
+def stream_words(words, list_type="dow", size=None, length=None, 
+                 extra_suffix="", file_name=None, chunk_size=100000):
+    """
+    Args:
+        words: Iterable containing words, e.g. a generator from list_words.
+        list_type: String, defaults to "dow".
+        size: Integer, defaults to None. Maximum word size, used 
+            with length for the file name if file_name is None.
+        length: Integer, defaults to None. Maximum word length.
+        extra_suffix: String, defaults to "".
+        file_name: String, defaults to None.
+        chunk_size: Integer, defaults to 100000.
+    Stores:
+        The words in words, writing chunk_size words at a time so that 
+        at most one chunk of words is held in memory.
+    Returns:
+        The number of words stored.
+    """
+    if file_name is None:
+        file_name = get_word_filename(
+            list_type, size, length, extra_suffix=extra_suffix)
+    word_count = 0
+    chunk = []
+    for word in words:
+        chunk.append(word)
+        if len(chunk) == chunk_size:
+            store_data(chunk, file_name, append=bool(word_count))
+            word_count += len(chunk)
+            chunk = []
+    if chunk or not word_count:
+        store_data(chunk, file_name, append=bool(word_count))
+        word_count += len(chunk)
+
+    return word_count
+
+
+def iterate_word_shards(shard_file_names):
+    """
+    Yields the words stored in each of the files in shard_file_names, 
+    in order, as strings.
+    """
+    for shard_file_name in shard_file_names:
+        for line in retrieve_data(shard_file_name):
+            yield line.rstrip("\n")
+
+
 def retrieve_words(list_type, file_name=None, size=None, length=None, 
-                   optimize=False, include_empty_word=True, ascending_order=None):
+                   optimize=False, include_empty_word=True, ascending_order=None,
+                   compact=False, chunk_size=65536):
+    """
+    If compact = True, returns an instance of WordArray instead of 
+    a list of words, without constructing any instances of Word; the 
+    words are packed chunk_size at a time as the lines are read.
+    """
     if file_name is None:
         file_name = get_word_filename(list_type, size, length)
     double_occurrence = False if list_type == "all" else True
     if ascending_order is None:
         ascending_order = True if list_type == "ao" else False
     word_list = []
+    word_arrays = []
     for line in retrieve_data(file_name, add_output_dir=False):
         if "," in line:
             letters = re.findall(r"\d+", line)
@@ -46,15 +103,43 @@ def retrieve_words(list_type, file_name=None, size=None, length=None,
             for i, letter in enumerate(letters):
                 if letter not in digit_strings:
                     letters[i] = chr(int(letter) + 87)
-            word = Word("".join(letters), ascending_order=ascending_order, 
-                        optimize=optimize)
+            word_string = "".join(letters)
+            if compact:
+                word_list.append(word_string)
+            else:
+                word_list.append(intern_word(
+                    word_string, ascending_order=ascending_order, 
+                    optimize=optimize))
+        elif compact:
+            word_list.append(line.strip())
         else:
-            word = Word(line.strip(), double_occurrence=double_occurrence, 
-                        ascending_order=ascending_order, optimize=optimize)
-        word_list.append(word)
+            word_list.append(intern_word(
+                line.strip(), double_occurrence=double_occurrence, 
+                ascending_order=ascending_order, optimize=optimize))
+        if compact:
+            if word_list[-1] == "":
+                include_empty_word = False
+            # Pack the strings read so far, instead of holding them all.
+            if len(word_list) == chunk_size:
+                word_arrays.append(WordArray.from_words(word_list))
+                word_list = []
+    if compact:
+        word_arrays.append(WordArray.from_words(word_list))
+        if include_empty_word:
+            word_arrays.insert(0, WordArray.from_words([""]))
+        return WordArray.concatenate(word_arrays)
     if "" not in word_list and include_empty_word:
         empty_word = Word("", double_occurrence=double_occurrence, 
                           ascending_order=ascending_order, optimize=optimize)
         word_list = [empty_word] + word_list
 
-    return word_list
\ No newline at end of file
+    return word_list
+
+
+def store_word_array(word_array, file_name):
+    """Stores an instance of WordArray in the NumPy .npz format."""
+    word_array.save(format_filename(file_name))
+
+
+def retrieve_word_array(file_name):
+    return WordArray.load(format_filename(file_name))
\ No newline at end of file
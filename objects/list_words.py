@@ -3,30 +3,48 @@ Functions for generating lists of words with various properties.
 
 Functions:
 
-    get_all_words, get_all_dows, get_dows, get_random_sample
+    get_all_words, get_all_dows, get_dows, get_dow_letters, iterate_all_words, 
+    iterate_all_dows, iterate_dows, generate_ascending_dows, 
+    store_dows_parallel, store_dow_shard, get_random_sample, sample_dows
 """
 
+import os
 from random import shuffle
 from itertools import permutations, combinations, product
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 
 from .objects import Word
 from .ascending_order import convert_to_ascending_order
+from .compact import (WordArray, LETTERS, irreducible_mask, 
+                      strongly_irreducible_mask)
+from .io import stream_words, iterate_word_shards
+from word_explorer.io import format_filename
 
 
-def get_all_words(max_length, alphabet_size):
+def get_all_words(max_length, alphabet_size, compact=False):
     """
     Args:
         max_length: Integer.
         alphabet_size: Integer.
+        compact: Boolean, defaults to False.
     Returns:
         A sorted list containing all words of length at most max_length
-        from the alphabet {1, 2, ..., alphabet_size}. 
+        from the alphabet {1, 2, ..., alphabet_size}. If compact = True,
+        an instance of WordArray is returned instead, filled directly 
+        from the generated strings.
     """
-    if alphabet_size**max_length > 30000000:
+    if alphabet_size > 9:
+        raise NotImplementedError("Need to expand allowed alphabets!")
+    elif compact:
+        return WordArray.from_words(
+            ("".join(letters) for length in range(1, max_length+1) 
+             for letters in product(LETTERS[:alphabet_size], repeat=length)), 
+            max_length=max_length)
+    elif alphabet_size**max_length > 30000000:
         raise ValueError(
             "Too many words to compute without likely exceeding memory limits!")
-    elif alphabet_size > 9:
-        raise NotImplementedError("Need to expand allowed alphabets!")
 
     word_list = []
     for length in range(1, max_length+1):
@@ -41,18 +59,26 @@ def get_all_words(max_length, alphabet_size):
     return word_list
 
 
-def get_all_dows(max_size):
+def get_all_dows(max_size, compact=False):
     """
     Args:
         max_size: Integer.
+        compact: Boolean, defaults to False.
     Returns:
         A sorted list containing all double occurrence words 
-        without bijective equivalence. 
+        without bijective equivalence. If compact = True, 
+        an instance of WordArray is returned instead, filled directly 
+        from the generated strings.
     """
     word_list = set()
     letter_list = [str(i) for i in range(1, min(max_size,9)+1)]
     if max_size > 9:
         letter_list.extend(chr(i+96) for i in range(10, max_size+1))
+    if compact:
+        return WordArray.from_words(
+            (word_string for size in range(1, max_size+1) 
+             for word_string in extend_dow([], {}, letter_list, size)), 
+            max_length=2*max_size)
     for size in range(1, max_size+1):
         print("generating words of size " + str(size) + "...")
         for letters in combinations(letter_list, size):
@@ -67,23 +93,44 @@ def get_all_dows(max_size):
 
 
 def get_dows(max_size, ascending_order=True, irreducible=False, 
-             strongly_irreducible=False):
+             strongly_irreducible=False, compact=False):
     """
     Args:
         max_size: Integer.
         ascending_order: Boolean, defaults to True.
+        irreducible: Boolean, defaults to False.
+        strongly_irreducible: Boolean, defaults to False.
+        compact: Boolean, defaults to False.
     Returns:
         A sorted list containing all double occurrence words, 
         where each word of size n is constructed from 
         the alphabet {1, 2, ..., n}. Bijective equivalence is assumed
-        if and only if ascending_order = True.
+        if and only if ascending_order = True. If compact = True, 
+        an instance of WordArray is returned instead, filled directly 
+        from the generated strings.
     """
+    if compact:
+        if ascending_order:
+            # The irreducibility filters prune the generation itself.
+            return WordArray.from_words(
+                (word_string for size in range(1, max_size+1) 
+                 for word_string in ascending_dow_strings(
+                    size, irreducible, strongly_irreducible)), 
+                max_length=2*max_size)
+        word_array = WordArray.from_words(
+            (word_string for size in range(1, max_size+1) 
+             for word_string in extend_dow(
+                [], {}, get_dow_letters(size), size)), 
+            max_length=2*max_size)
+        if irreducible:
+            word_array = word_array[irreducible_mask(word_array)]
+        if strongly_irreducible:
+            word_array = word_array[strongly_irreducible_mask(word_array)]
+        return word_array
     word_list = set()
     for size in range(1, max_size+1):
         print("generating words of size " + str(size) + "...")
-        letters = [str(i) for i in range(1, min(size,9)+1)]
-        if size > 9:
-            letters.extend(chr(i+96) for i in range(10, size+1))
+        letters = get_dow_letters(size)
         words = set(Word("".join(tupl), double_occurrence=False, optimize=True)
                     for tupl in permutations(letters*2))
         if ascending_order:
@@ -101,6 +148,258 @@ def get_dows(max_size, ascending_order=True, irreducible=False,
     return word_list
 
 
+def get_dow_letters(size):
+    """Returns the list of letters of the words of size `size` of get_dows."""
+    letters = [str(i) for i in range(1, min(size,9)+1)]
+    if size > 9:
+        letters.extend(chr(i+96) for i in range(10, size+1))
+    return letters
+
+
+def iterate_all_words(max_length, alphabet_size):
+    """
+    Args:
+        max_length: Integer.
+        alphabet_size: Integer.
+    Yields:
+        All words of length at most max_length from the alphabet 
+        {1, 2, ..., alphabet_size} in the same order as get_all_words, 
+        without holding them in memory.
+    """
+    if alphabet_size > len(LETTERS):
+        raise NotImplementedError("Need to expand allowed alphabets!")
+    for length in range(1, max_length+1):
+        for letters in product(LETTERS[:alphabet_size], repeat=length):
+            yield Word("".join(letters), double_occurrence=False, optimize=True)
+
+
+def iterate_all_dows(max_size):
+    """
+    Args:
+        max_size: Integer.
+    Yields:
+        All double occurrence words without bijective equivalence 
+        in the same order as get_all_dows, without holding them in memory.
+    """
+    letter_list = [str(i) for i in range(1, min(max_size,9)+1)]
+    if max_size > 9:
+        letter_list.extend(chr(i+96) for i in range(10, max_size+1))
+    for size in range(1, max_size+1):
+        for word_string in extend_dow([], {}, letter_list, size):
+            yield Word(word_string, double_occurrence=False, optimize=True)
+
+
+def iterate_dows(max_size, ascending_order=True, irreducible=False, 
+                 strongly_irreducible=False):
+    """
+    Args:
+        max_size: Integer.
+        ascending_order: Boolean, defaults to True.
+        irreducible: Boolean, defaults to False.
+        strongly_irreducible: Boolean, defaults to False.
+    Yields:
+        The words of get_dows, in the same order, without holding them 
+        in memory.
+    """
+    for size in range(1, max_size+1):
+        if ascending_order:
+            yield from generate_ascending_dows(
+                size, irreducible, strongly_irreducible)
+            continue
+        letters = get_dow_letters(size)
+        for word_string in extend_dow([], {}, letters, size):
+            if ((irreducible and not Word.irreducible(word_string)) 
+                    or (strongly_irreducible 
+                        and not Word.strongly_irreducible(word_string))):
+                continue
+            yield Word(word_string, double_occurrence=False, optimize=True)
+
+
+def extend_dow(letters, letter_counts, alphabet, size):
+    """
+    Yields, in lexicographic order, all double occurrence words of 
+    size `size` with letters from the sorted list alphabet 
+    that start with the letters in the list letters, where 
+    letter_counts maps each letter to its number of occurrences in letters.
+    """
+    if len(letters) == 2*size:
+        yield "".join(letters)
+        return
+    new_letters_allowed = len(letter_counts) < size
+    for letter in alphabet:
+        count = letter_counts.get(letter, 0)
+        if count == 2 or (count == 0 and not new_letters_allowed):
+            continue
+        letter_counts[letter] = count + 1
+        letters.append(letter)
+        yield from extend_dow(letters, letter_counts, alphabet, size)
+        letters.pop()
+        if count == 0:
+            del letter_counts[letter]
+        else:
+            letter_counts[letter] = count
+
+
+def generate_ascending_dows(size, irreducible=False, strongly_irreducible=False, 
+                            prefix=""):
+    """
+    Args:
+        size: Integer.
+        irreducible: Boolean, defaults to False.
+        strongly_irreducible: Boolean, defaults to False.
+        prefix: String, defaults to "". If provided, only words 
+            starting with prefix are generated.
+    Yields:
+        Every double occurrence word of size `size` in ascending order
+        exactly once, in lexicographic order. Each word is constructed 
+        directly, letter by letter, by either repeating a letter occurring 
+        once so far or adding the smallest unused letter, and the 
+        irreducibility filters prune partial words during the construction.
+    """
+    for word_string in ascending_dow_strings(
+            size, irreducible, strongly_irreducible, prefix):
+        yield Word(word_string, double_occurrence=False, 
+                   ascending_order=True, optimize=True)
+
+
+def ascending_dow_strings(size, irreducible=False, strongly_irreducible=False, 
+                          prefix="", prefix_length=None):
+    """
+    Same as generate_ascending_dows, but yields strings. If prefix_length 
+    is provided, yields the prefixes of length prefix_length of the 
+    words instead (some of which may have no completions if a filter is 
+    used).
+    """
+    if size > len(LETTERS):
+        raise NotImplementedError("Need to expand allowed alphabets!")
+    length = 2*size
+    # The prefix parities (see objects.prefix_parities) of a partial word 
+    # are exactly the bitmasks of its letters occurring once so far.
+    parities = [0]
+    new_letter = 0
+    for letter in prefix:
+        code = LETTERS.find(letter)
+        if code == new_letter and new_letter < size:
+            new_letter += 1
+        elif code == -1 or not parities[-1] & (1 << code):
+            raise ValueError("Prefix is not a prefix of an ascending order "
+                             + "double occurrence word of size " 
+                             + str(size) + "!")
+        parities.append(parities[-1] ^ (1 << code))
+        if len(parities) > length+1 or is_pruned(
+                parities, length, irreducible, strongly_irreducible):
+            return
+
+    yield from extend_ascending_dow(list(prefix), parities, new_letter, size, 
+                                    irreducible, strongly_irreducible, 
+                                    prefix_length)
+
+
+def is_pruned(parities, length, irreducible, strongly_irreducible):
+    """
+    Checks whether the last letter of a partial word with prefix parities 
+    parities makes it impossible to complete to a word satisfying the filters.
+    """
+    if len(parities) > length:
+        return False
+    elif irreducible and parities[-1] == 0:
+        return True
+    elif strongly_irreducible and parities[-1] in parities[:-1]:
+        return True
+    else:
+        return False
+
+
+def extend_ascending_dow(letters, parities, new_letter, size, 
+                         irreducible, strongly_irreducible, prefix_length=None):
+    if len(letters) == (2*size if prefix_length is None else prefix_length):
+        yield "".join(letters)
+        return
+    codes = [code for code in range(new_letter) if parities[-1] & (1 << code)]
+    if new_letter < size:
+        codes.append(new_letter)
+    for code in codes:
+        parities.append(parities[-1] ^ (1 << code))
+        if not is_pruned(parities, 2*size, irreducible, strongly_irreducible):
+            letters.append(LETTERS[code])
+            yield from extend_ascending_dow(
+                letters, parities, new_letter + (code == new_letter), size, 
+                irreducible, strongly_irreducible, prefix_length)
+            letters.pop()
+        parities.pop()
+
+
+def store_dows_parallel(max_size, file_name, irreducible=False, 
+                        strongly_irreducible=False, max_workers=None, 
+                        prefix_length=None):
+    """
+    Args:
+        max_size: Integer.
+        file_name: String.
+        irreducible: Boolean, defaults to False.
+        strongly_irreducible: Boolean, defaults to False.
+        max_workers: Integer, defaults to None. Number of worker processes, 
+            defaults to the number of processors.
+        prefix_length: Integer, defaults to None. Length of the prefixes 
+            used to split the words of each size into shards; if None, 
+            the shortest length giving at least 8 shards per worker is used.
+    Stores:
+        All double occurrence words in ascending order of size at most 
+        max_size, in the same order as get_dows, in the file file_name. 
+        The words of each size are split by prefix into shards, each 
+        shard is generated and stored by a worker process, and 
+        the shard files are then merged in order and deleted.
+    Returns:
+        The number of words stored.
+    """
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    shard_file_names = []
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = []
+        for size in range(1, max_size+1):
+            if prefix_length is None:
+                size_prefix_length = 0
+                prefixes = [""]
+                while (len(prefixes) < 8*max_workers 
+                        and size_prefix_length < 2*size):
+                    size_prefix_length += 1
+                    prefixes = list(ascending_dow_strings(
+                        size, irreducible, strongly_irreducible, 
+                        prefix_length=size_prefix_length))
+            else:
+                prefixes = list(ascending_dow_strings(
+                    size, irreducible, strongly_irreducible, 
+                    prefix_length=min(prefix_length, 2*size)))
+            for prefix in prefixes:
+                shard_file_name = (file_name + ".shard" 
+                                   + str(len(shard_file_names)))
+                shard_file_names.append(shard_file_name)
+                futures.append(executor.submit(
+                    store_dow_shard, size, prefix, irreducible, 
+                    strongly_irreducible, shard_file_name))
+        for future in futures:
+            future.result()
+
+    word_count = stream_words(iterate_word_shards(shard_file_names), 
+                              file_name=file_name)
+    for shard_file_name in shard_file_names:
+        os.remove(format_filename(shard_file_name))
+
+    return word_count
+
+
+def store_dow_shard(size, prefix, irreducible, strongly_irreducible, 
+                    file_name):
+    """
+    Stores all double occurrence words in ascending order of size 
+    `size` starting with prefix in the file file_name.
+    Returns the number of words stored.
+    """
+    return stream_words(ascending_dow_strings(
+        size, irreducible, strongly_irreducible, prefix), file_name=file_name)
+
+
 def get_random_sample(word_list):
     """
     Args:
@@ -116,4 +415,57 @@ def get_random_sample(word_list):
         random_word = Word(convert_to_ascending_order("".join(letters)), optimize=True)
         random_sample.append(random_word)
 
-    return random_sample
\ No newline at end of file
+    return random_sample
+
+
+def sample_dows(size, count, irreducible=False, strongly_irreducible=False, 
+                seed=None, batch_size=65536):
+    """
+    Args:
+        size: Integer.
+        count: Integer, the number of words to sample.
+        irreducible: Boolean, defaults to False.
+        strongly_irreducible: Boolean, defaults to False.
+        seed: Integer or None, defaults to None. Seed for NumPy's 
+            random number generator.
+        batch_size: Integer, defaults to 65536. Number of words 
+            sampled at a time.
+    Returns:
+        An instance of WordArray containing count independent, uniformly 
+        sampled double occurrence words of size `size` in ascending order. 
+        If irreducible = True or strongly_irreducible = True, words are 
+        sampled uniformly from the (strongly) irreducible words by rejection.
+    """
+    if size > len(LETTERS):
+        raise NotImplementedError("Need to expand allowed alphabets!")
+    random_generator = np.random.default_rng(seed)
+    length = 2*size
+    samples = []
+    sample_count = 0
+    while sample_count < count:
+        batch_count = batch_size if (irreducible or strongly_irreducible) \
+                      else min(batch_size, count - sample_count)
+        rows = np.arange(batch_count)[:, np.newaxis]
+        # Pairing consecutive entries of a uniformly random permutation of 
+        # the positions gives a uniformly random perfect matching.
+        positions = np.argsort(random_generator.random((batch_count, length)), 
+                               axis=1)
+        first_positions = np.minimum(positions[:, 0::2], positions[:, 1::2])
+        # Label the pairs in order of their first occurrence.
+        labels = np.empty((batch_count, size), dtype=np.uint8)
+        labels[rows, np.argsort(first_positions, axis=1)] = np.arange(size)
+        codes = np.empty((batch_count, length), dtype=np.uint8)
+        codes[rows, positions[:, 0::2]] = labels
+        codes[rows, positions[:, 1::2]] = labels
+        word_array = WordArray(codes, np.full(batch_count, length))
+        if irreducible:
+            word_array = word_array[irreducible_mask(word_array)]
+        if strongly_irreducible:
+            word_array = word_array[strongly_irreducible_mask(word_array)]
+        word_array = word_array[:count - sample_count]
+        samples.append(word_array)
+        sample_count += len(word_array)
+
+    if not samples:
+        return WordArray(max_length=length)
+    return WordArray.concatenate(samples)
@@ -3,16 +3,22 @@ Basic classes and functions for working with words and patterns.
 
 Classes:
 
-	Word, GeneralizedPattern, PatternExample, Pattern, PatternIndex
+	word_property, Word, GeneralizedPattern, PatternExample, Pattern, 
+	Matcher, PatternMatcher, GeneralizedPatternMatcher, PatternIndex
 
 Functions:
 
-	is_equivalent, is_equivalent_ascending, subwords, find_instances
+	is_equivalent, is_equivalent_ascending, canonical_form, 
+	prefix_parities, double_occurrence_prefixes, intern_word, subwords, 
+	find_instances, iterate_instances, find_pattern_instances, 
+	extend_example_instance, find_example_instances_by_combinations, 
+	compile_pattern
 """
 
 import re
+from weakref import WeakValueDictionary
 from itertools import combinations, chain
-from collections import Counter, OrderedDict
+from collections import Counter
 
 
 def is_equivalent(seq1, seq2):
@@ -31,6 +37,75 @@ def is_equivalent_ascending(seq1, seq2):
 	return str(seq1) == str(seq2)
 
 
+def canonical_form(seq):
+	"""
+	Returns a tuple containing, for each element of seq, the number of 
+	distinct elements preceding its first occurrence in seq. Two sequences 
+	are equivalent (see is_equivalent) if and only if their canonical 
+	forms are equal.
+	"""
+	first_occurrences = {}
+	return tuple(first_occurrences.setdefault(element, len(first_occurrences)) 
+				 for element in seq)
+
+
+def prefix_parities(word_string):
+	"""
+	Returns a list whose ith element is a bitmask with the bit of a letter 
+	set if and only if the letter occurs an odd number of times in 
+	word_string[:i]. If word_string is a double occurrence word, then 
+	word_string[i:j] is a double occurrence word if and only if i < j and 
+	the ith and jth elements are equal.
+	"""
+	letter_bits = {}
+	parities = [0]
+	for letter in word_string:
+		bit = letter_bits.setdefault(letter, 1 << len(letter_bits))
+		parities.append(parities[-1] ^ bit)
+	return parities
+
+
+def double_occurrence_prefixes(word_string):
+	"""
+	Returns a list whose ith element is True if and only if 
+	word_string[:i] is a double occurrence word, computed in linear time.
+	"""
+	letter_counts = {}
+	invalid_letters = 0		# Number of letters not occurring exactly twice
+	prefixes = [False]
+	for letter in word_string:
+		count = letter_counts.get(letter, 0)
+		if count == 0 or count == 2:
+			invalid_letters += 1
+		elif count == 1:
+			invalid_letters -= 1
+		letter_counts[letter] = count + 1
+		prefixes.append(invalid_letters == 0)
+	return prefixes
+
+
+class word_property():
+	"""
+	Decorator for a function of a word string, such as Word.irreducible. 
+	Accessed through the class, the function is returned unchanged and 
+	can be called on any string, like a staticmethod. Accessed through 
+	an instance of Word, the function is evaluated on that instance when 
+	first accessed and the value is stored in the instance dictionary, 
+	which takes precedence over this (non-data) descriptor afterwards.
+	"""
+	def __init__(self, function):
+		self.function = function
+		self.name = function.__name__
+		self.__doc__ = function.__doc__
+
+	def __get__(self, instance, owner=None):
+		if instance is None:
+			return self.function
+		value = self.function(instance)
+		instance.__dict__[self.name] = value
+		return value
+
+
 class Word(str):
 	"""
 	A word is a subclass of str. 
@@ -40,9 +115,19 @@ class Word(str):
 	is used to check equality; if double_occurrence = False, 
 	simple string equality is used instead.
 
+	The canonical form of the word (see canonical_form) is computed 
+	once, when first needed, and reused for hashing and equality.
+
+	Likewise, irreducible and strongly_irreducible are only computed 
+	when first accessed on an instance and then cached (see 
+	word_property), so constructing a word costs little more than 
+	constructing a string. Called on the class, e.g. 
+	Word.irreducible(word_string), they act as static methods.
+
 	Custom Methods:
-		double_occurrence_word, irreducible, strongly_irreducible, 
-		delete_letter, find_instances, perform_reduction
+		canonical_key, double_occurrence_word, irreducible, 
+		strongly_irreducible, delete_letter, find_instances, 
+		perform_reduction
 	"""
 	def __new__(cls, content, double_occurrence=True, **kwargs):
 		if (double_occurrence and content != "" 
@@ -52,43 +137,50 @@ class Word(str):
 			return str.__new__(cls, content)
 
 	def __eq__(self, other):
+		if self is other:
+			return True
 		if not self.ascending_order or self.optimize:
 			return str(self) == str(other)
-		if self is None:
-			return other is None
-		elif other is None:
-			return self is None
+		if other is None:
+			return False
+		elif isinstance(other, Word):
+			return self.canonical_key == other.canonical_key
 		else:
-			return is_equivalent(self, other)
+			return self.canonical_key == canonical_form(other)
 
 	def __ne__(self, other):
 		return not self.__eq__(other)
 
 	def __hash__(self):
 		if self.ascending_order or not self.optimize:
-			letter_indices = OrderedDict()
-			for i, letter in enumerate(self):
-				letter_indices.setdefault(letter, [])
-				letter_indices[letter].append(i)
-			letter_indices_list = []
-			for index_list in letter_indices.values():
-				index_list = tuple(index_list)
-				letter_indices_list.append(index_list)
-			return hash((tuple(letter_indices_list), ))
+			return hash(self.canonical_key)
 		else:
 			return hash(str(self))
 
 	def __init__(self, content, double_occurrence=True, 
 				 ascending_order=False, optimize=False):
-		self.double_occurrence = (False if not double_occurrence 
-								  else Word.double_occurrence_word(content)) 
+		# __new__ has already checked that content is a double 
+		# occurrence word if double_occurrence is True.
+		self.double_occurrence = bool(double_occurrence) and content != ""
 		self.ascending_order = ascending_order
 		self.optimize = optimize
-		if double_occurrence:
-			self.size = len(self) // 2
-		if not self.optimize:
-			self.irreducible = Word.irreducible(content)
-			self.strongly_irreducible = Word.strongly_irreducible(content)
+
+	@property
+	def size(self):
+		return len(self) // 2
+
+	def __getnewargs__(self):
+		# Skips the double occurrence check when unpickling, since the 
+		# attributes, including double_occurrence, are restored afterwards.
+		return (str(self), False)
+
+	@property
+	def canonical_key(self):
+		try:
+			return self._canonical_key
+		except AttributeError:
+			self._canonical_key = canonical_form(self)
+			return self._canonical_key
 
 	@staticmethod
 	def double_occurrence_word(word_string):
@@ -98,21 +190,39 @@ class Word(str):
 		else:
 			return False
 
-	@staticmethod
+	@word_property
 	def irreducible(word_string):
-		for i in range(1, len(word_string)-1):
-			if (Word.double_occurrence_word(word_string[:i]) 
-			and Word.double_occurrence_word(word_string[i:])):
+		length = len(word_string)
+		if Word.double_occurrence_word(word_string):
+			# Reducible iff some proper prefix contains each letter twice.
+			return 0 not in prefix_parities(word_string)[1:length-1]
+		prefixes = double_occurrence_prefixes(word_string)
+		suffixes = double_occurrence_prefixes(word_string[::-1])
+		for i in range(1, length-1):
+			if prefixes[i] and suffixes[length-i]:
 				return False
 		return True
 
-	@staticmethod
+	@word_property
 	def strongly_irreducible(word_string):
+		length = len(word_string)
+		if Word.double_occurrence_word(word_string):
+			# A factor not containing the last letter is a double occurrence 
+			# word iff two of the first length prefix parities are equal.
+			return len(set(prefix_parities(word_string)[:length])) == length
 		if Word.irreducible(word_string) == False:
 			return False
-		for i in range(len(word_string)):
-			for j in range(i+2, len(word_string)):
-				if Word.double_occurrence_word(word_string[i:j]):
+		for i in range(length):
+			letter_counts = Counter()
+			invalid_letters = 0
+			for j in range(i, length-1):
+				count = letter_counts[word_string[j]]
+				if count == 0 or count == 2:
+					invalid_letters += 1
+				elif count == 1:
+					invalid_letters -= 1
+				letter_counts[word_string[j]] = count + 1
+				if invalid_letters == 0:
 					return False
 		return True
 
@@ -122,61 +232,12 @@ class Word(str):
 
 	def find_instances(self, pattern):
 		"""
-		Input: An instance of Pattern or GeneralizedPattern.
+		Input: An instance of Pattern, GeneralizedPattern, or Matcher 
+			   (see compile_pattern).
 		Returns: List of lists of indices of the instances of the 
 				 input pattern in this word.
 		"""
-		if type(pattern) == GeneralizedPattern:
-			return find_instances(self, pattern)
-		else:
-			pattern_parts = [pattern[i].split("...") 
-							 for i in range(len(pattern))]
-			pattern_parts_sizes = ([len(part) for part in pattern_parts[i]] 
-								   for i in range(len(pattern_parts)))
-			instances = []
-			sizes_found = set()
-			for i, sizes in enumerate(pattern_parts_sizes):
-				# First test if there is a size dependency and that an 
-				# instance of that size was not found already.
-				if i >= 2:
-					skip = False
-					for j in range(2,i+1):
-						if j in pattern.size_dependencies.get(i+1, set()) \
-						and j not in sizes_found:
-							skip = True
-							break
-					if skip:
-						continue
-
-				start_index_lists = combinations(range(len(self)), len(sizes))
-				for indices in start_index_lists:
-					# First check if these indices are spread wide 
-					# enough for this pattern example.
-					valid_starts = True
-					for j, size in enumerate(sizes):
-						try:
-							if not indices[j+1]-indices[j] >= size:
-								valid_starts = False
-								break
-						except IndexError:
-							break
-					if not len(self)-indices[-1] >= sizes[-1]:
-						valid_starts = False
-					if not valid_starts:
-						continue
-					# Indices have passed, so compare the sequence defined 
-					# by these indices against the pattern. 
-					else:
-						sequence = []
-						sequence_indices = []
-						for size, index in zip(sizes, indices):
-							sequence.append(self[index:index+size])
-							sequence_indices.extend(range(index, index+size))
-						if pattern.is_instance(sequence, i+1):
-							instances.append(sequence_indices)
-							sizes_found.add(i+1)
-
-			return instances
+		return compile_pattern(pattern).find_instances(self)
 
 	def perform_reduction(self, pattern_instance_indices):
 		return Word("".join(self[i] for i in range(len(self)) 
@@ -184,6 +245,36 @@ class Word(str):
 					double_occurrence=self.double_occurrence)
 
 
+_interned_words = WeakValueDictionary()
+
+
+def intern_word(content, double_occurrence=True, 
+				ascending_order=False, optimize=False):
+	"""
+	Args:
+		content: String or instance of Word.
+		double_occurrence: Boolean, defaults to True.
+		ascending_order: Boolean, defaults to False.
+		optimize: Boolean, defaults to False.
+	Returns:
+		Word(content, double_occurrence, ascending_order, optimize), 
+		shared with every other call with the same arguments for as long 
+		as the word is referenced somewhere, so that a word stored in many 
+		neighborhoods, subgraphs, or reductions is only constructed once. 
+		Since interned words are shared, their attributes should not be 
+		modified.
+	"""
+	key = (str(content), bool(double_occurrence), 
+		   bool(ascending_order), bool(optimize))
+	word = _interned_words.get(key, None)
+	if word is None:
+		word = Word(key[0], double_occurrence=double_occurrence, 
+					ascending_order=ascending_order, optimize=optimize)
+		if word is not None:
+			_interned_words[key] = word
+	return word
+
+
 def max_word_size(word_list):
 	return max(word.size for word in word_list)
 
@@ -353,21 +444,120 @@ def find_instances(word, pattern):
 	"""
 	Args:
 		word: An instance of Word.
-		pattern: An instance of GeneralizedPattern.
+		pattern: An instance of GeneralizedPattern or 
+			GeneralizedPatternMatcher.
 	Returns:
-		A list...
+		A list containing the list of indices of each instance of 
+		pattern in word (see iterate_instances).
 	"""
-	if type(pattern) != GeneralizedPattern:
+	if type(pattern) not in (GeneralizedPattern, GeneralizedPatternMatcher):
 		raise TypeError("Expects pattern of type 'GeneralizedPattern'")
 	else:
-		instances = []
-		all_subword_indices = subwords(word, max_length=len(pattern))
-		for subword_indices in all_subword_indices:
-			subword = ["".join(word[i] for i in factor_indices) 
-					   for factor_indices in subword_indices]
-			if pattern.instance(subword):
-				instances.append(list(chain.from_iterable(subword_indices)))
-		return instances
+		return list(iterate_instances(word, pattern))
+
+
+def iterate_instances(word, pattern):
+	"""
+	Args:
+		word: String or instance of Word.
+		pattern: An instance of GeneralizedPattern or 
+			GeneralizedPatternMatcher.
+	Yields:
+		The list of indices of each instance of pattern in word, 
+		in the order of the corresponding subwords in subwords(word). 
+		Factors of word are matched to the variables of pattern from 
+		left to right and each variable is bound to its image when first 
+		matched, so that only factors consistent with the images bound 
+		so far are tried.
+	"""
+	return compile_pattern(pattern).iterate_instances(word)
+
+
+def find_pattern_instances(word, pattern):
+	"""
+	Args:
+		word: String or instance of Word.
+		pattern: An instance of Pattern or PatternMatcher.
+	Returns:
+		A list of lists of indices of the instances of pattern in word, 
+		ordered by pattern size and then by the starting indices of their 
+		factors. A size is skipped if pattern has no instances of some 
+		size it depends on (see Pattern.find_size_dependencies).
+	"""
+	return compile_pattern(pattern).find_instances(word)
+
+
+def extend_example_instance(word, example_parts, letter_positions, 
+							start, indices, letter_map, inverse_letter_map):
+	"""
+	Yields the instances of the pattern example with factors example_parts 
+	in word extending a partial instance, where indices contains the 
+	indices of the factors matched so far, the next factor starts at index 
+	start or later, and letter_map is the bijection between the example 
+	letters and word letters matched so far, with inverse inverse_letter_map. 
+
+	If the next factor contains an example letter that is already mapped, 
+	the factor can only start at an offset from an occurrence of its image, 
+	so only those starting indices are tried.
+	"""
+	part_index = len(indices)
+	if part_index == len(example_parts):
+		yield list(chain.from_iterable(indices))
+		return
+	part = example_parts[part_index]
+	last_start = len(word) - len(part)
+	for offset, example_letter in enumerate(part):
+		if example_letter in letter_map:
+			starts = [position - offset for position 
+					  in letter_positions[letter_map[example_letter]]
+					  if start <= position - offset <= last_start]
+			break
+	else:
+		starts = range(start, last_start+1)
+	for factor_start in starts:
+		new_letters = []
+		for example_letter, letter in zip(
+				part, word[factor_start:factor_start+len(part)]):
+			image = letter_map.get(example_letter, None)
+			if image is None and letter not in inverse_letter_map:
+				letter_map[example_letter] = letter
+				inverse_letter_map[letter] = example_letter
+				new_letters.append(example_letter)
+			elif image != letter:
+				break
+		else:
+			indices.append(range(factor_start, factor_start+len(part)))
+			yield from extend_example_instance(
+				word, example_parts, letter_positions, 
+				factor_start+len(part), indices, letter_map, inverse_letter_map)
+			indices.pop()
+		for example_letter in new_letters:
+			del inverse_letter_map[letter_map.pop(example_letter)]
+
+
+def find_example_instances_by_combinations(word, example_parts):
+	"""
+	Finds the instances of a pattern example with factors example_parts 
+	by testing every combination of starting indices.
+	"""
+	sizes = [len(part) for part in example_parts]
+	example_joined = "".join(example_parts)
+	instances = []
+	for indices in combinations(range(len(word)), len(sizes)):
+		# First check if these indices are spread wide 
+		# enough for this pattern example.
+		if (any(indices[j+1] - indices[j] < size 
+				for j, size in enumerate(sizes[:-1]))
+				or len(word) - indices[-1] < sizes[-1]):
+			continue
+		sequence_indices = []
+		for size, index in zip(sizes, indices):
+			sequence_indices.extend(range(index, index+size))
+		if is_equivalent(example_joined, 
+						 "".join(word[j] for j in sequence_indices)):
+			instances.append(sequence_indices)
+
+	return instances
 
 
 class PatternExample(str):
@@ -431,7 +621,8 @@ class Pattern(list):
 
 		find_size_dependencies -- Creates a dictionary mapping pattern sizes
 								  to lists of those smaller sizes their 
-								  existence is dependent upon.
+								  existence is dependent upon; the result 
+								  is cached as size_dependencies.
 	"""
 
 	def __init__(self, *args, name=None, base=None, inductive_step=None):
@@ -494,7 +685,6 @@ class Pattern(list):
 				self.append(PatternExample("".join(next_example)))
 
 		self.name = name
-		self.size_dependencies = self.find_size_dependencies()
 		if base is not None:
 			self.base = PatternExample(base)
 		self.inductive_step = inductive_step
@@ -504,7 +694,17 @@ class Pattern(list):
 			if self.base is not None:
 				raise TypeError("This pattern is already defined inductively.")
 		list.append(self, *args)
-		self.size_dependencies = self.find_size_dependencies()
+		self._size_dependencies = None
+
+	@property
+	def size_dependencies(self):
+		"""
+		The result of find_size_dependencies, computed when first needed 
+		and again only after the pattern is extended.
+		"""
+		if getattr(self, "_size_dependencies", None) is None:
+			self._size_dependencies = self.find_size_dependencies()
+		return self._size_dependencies
 
 	def __eq__(self, other):
 		return self.name == other.name
@@ -563,6 +763,200 @@ class Pattern(list):
 			return False
 
 
+class Matcher():
+	"""
+	Base class of the immutable matchers returned by compile_pattern. 
+	Attributes are set once, when compiled, and cannot be modified.
+	"""
+	__slots__ = ()
+
+	def __setattr__(self, name, value):
+		raise AttributeError("Matchers are immutable!")
+
+	def __delattr__(self, name):
+		raise AttributeError("Matchers are immutable!")
+
+
+class PatternMatcher(Matcher):
+	"""
+	A compiled Pattern. Stores the factors of each pattern example, 
+	the examples with their gaps removed, and, for each pattern size, 
+	the smaller sizes an instance of that size depends on 
+	(see Pattern.find_size_dependencies).
+
+	Methods:
+		find_instances, is_instance
+	"""
+	__slots__ = ("name", "example_parts", "joined_examples", 
+				 "required_sizes", "letter_removal")
+
+	def __init__(self, pattern):
+		example_parts = tuple(tuple(example.split("...")) 
+							  for example in pattern)
+		dependencies = pattern.size_dependencies
+		object.__setattr__(self, "name", pattern.name)
+		object.__setattr__(self, "example_parts", example_parts)
+		object.__setattr__(self, "joined_examples", 
+						   tuple("".join(parts) for parts in example_parts))
+		object.__setattr__(self, "required_sizes", tuple(
+			frozenset(j for j in dependencies.get(i+1, ()) if 2 <= j <= i) 
+			for i in range(len(example_parts))))
+		object.__setattr__(self, "letter_removal", 
+						   len(pattern) == 1 and self.is_instance(["1", "1"], 1))
+
+	def __len__(self):
+		return len(self.example_parts)
+
+	def is_instance(self, sequence, pattern_size):
+		"""See Pattern.is_instance."""
+		return is_equivalent(self.joined_examples[pattern_size-1], 
+							 "".join(sequence))
+
+	def find_instances(self, word):
+		"""See find_pattern_instances."""
+		letter_positions = {}
+		for i, letter in enumerate(word):
+			letter_positions.setdefault(letter, []).append(i)
+		instances = []
+		sizes_found = set()
+		for i, example_parts in enumerate(self.example_parts):
+			# First test if there is a size dependency and that an 
+			# instance of that size was not found already.
+			if not self.required_sizes[i] <= sizes_found:
+				continue
+			if "" in example_parts:
+				size_instances = find_example_instances_by_combinations(
+					word, example_parts)
+			else:
+				size_instances = list(extend_example_instance(
+					word, example_parts, letter_positions, 0, [], {}, {}))
+			if size_instances:
+				instances.extend(size_instances)
+				sizes_found.add(i+1)
+
+		return instances
+
+
+class GeneralizedPatternMatcher(Matcher):
+	"""
+	A compiled GeneralizedPattern. Numbers the variables of the pattern 
+	in order of first occurrence and stores, for each factor, the number 
+	of its variable, whether the variable already occurs in an earlier 
+	factor, and whether it is reversed.
+
+	Methods:
+		find_instances, iterate_instances, extend_instance
+	"""
+	__slots__ = ("strict", "literal", "length", "variable_count", "factors")
+
+	def __init__(self, pattern):
+		variable_numbers = {}
+		factors = []
+		for variable, reversed_indicator in pattern:
+			bound = variable in variable_numbers
+			number = variable_numbers.setdefault(variable, len(variable_numbers))
+			factors.append((number, bound, reversed_indicator == "R"))
+		object.__setattr__(self, "strict", pattern.strict)
+		object.__setattr__(self, "literal", pattern.literal)
+		object.__setattr__(self, "length", len(pattern))
+		object.__setattr__(self, "variable_count", len(variable_numbers))
+		object.__setattr__(self, "factors", tuple(factors))
+
+	def __len__(self):
+		return self.length
+
+	def find_instances(self, word):
+		"""See find_instances."""
+		return list(self.iterate_instances(word))
+
+	def iterate_instances(self, word):
+		"""See iterate_instances."""
+		if self.strict:
+			# Strict patterns are matched by single factors.
+			for start in range(len(word)):
+				for end in range(start+1, len(word)+1):
+					if not self.literal or end - start == self.length:
+						yield list(range(start, end))
+		else:
+			yield from self.extend_instance(
+				word, 0, [], [None]*self.variable_count)
+
+	def extend_instance(self, word, start, indices, images):
+		"""
+		Yields the instances of the pattern in word extending a partial 
+		instance, where indices contains the indices of the factors matched 
+		so far, the next factor starts at index start or later, and images 
+		contains the image of each variable bound so far, by number.
+		"""
+		factor_count = len(indices)
+		if factor_count == self.length:
+			yield list(chain.from_iterable(indices))
+			return
+		number, bound, reversed_variable = self.factors[factor_count]
+		if bound:
+			image = images[number]
+			if reversed_variable:
+				image = image[::-1]
+		# Every remaining factor needs at least one letter.
+		last_end = len(word) - (self.length - factor_count - 1)
+		for factor_start in range(start, last_end):
+			if bound:
+				ends = [factor_start + len(image)]
+			elif self.literal:
+				ends = [factor_start + 1]
+			else:
+				ends = range(factor_start+1, last_end+1)
+			for end in ends:
+				if end > last_end:
+					break
+				factor = word[factor_start:end]
+				if bound:
+					if factor != image:
+						continue
+				else:
+					images[number] = (factor[::-1] if reversed_variable 
+									  else factor)
+				indices.append(range(factor_start, end))
+				yield from self.extend_instance(word, end, indices, images)
+				indices.pop()
+		if not bound:
+			images[number] = None
+
+
+_compiled_patterns = {}
+
+
+def compile_pattern(pattern):
+	"""
+	Args:
+		pattern: An instance of Pattern, GeneralizedPattern, or Matcher.
+	Returns:
+		The PatternMatcher or GeneralizedPatternMatcher of pattern; 
+		a Matcher is returned unchanged. Matchers are kept in a 
+		process-wide registry keyed by the contents of the pattern, so 
+		each pattern is compiled once and then shared by every word 
+		it is matched against, even when the pattern itself is 
+		reconstructed, e.g. by StorageHandler.get_pattern.
+	"""
+	if isinstance(pattern, Matcher):
+		return pattern
+	elif isinstance(pattern, GeneralizedPattern):
+		key = (GeneralizedPattern, tuple(pattern), 
+			   pattern.strict, pattern.literal)
+	elif isinstance(pattern, Pattern):
+		key = (Pattern, pattern.name, tuple(str(example) for example in pattern))
+	else:
+		raise TypeError("Expects an instance of Pattern or GeneralizedPattern")
+	matcher = _compiled_patterns.get(key, None)
+	if matcher is None:
+		if isinstance(pattern, GeneralizedPattern):
+			matcher = GeneralizedPatternMatcher(pattern)
+		else:
+			matcher = PatternMatcher(pattern)
+		_compiled_patterns[key] = matcher
+	return matcher
+
+
 class PatternIndex():
 
 	def __init__(self, name, patterns, reductions=None):
@@ -0,0 +1,110 @@
+"""
+A perfect ranking of double occurrence words in ascending order, i.e.
+a bijection between the ascending order double occurrence words of
+size n and the integers 0, 1, ..., (2n-1)!! - 1 that preserves
+lexicographic order.
+
+Reading an ascending order double occurrence word from its start, each
+letter either repeats a letter occurring once so far (an 'open' letter)
+or is the smallest unused letter, and the number of ways to complete
+a partial word only depends on how many letters are open and unused.
+
+Functions:
+
+    completion_count, dow_count, rank_dow, unrank_dow
+"""
+
+from math import factorial
+from functools import lru_cache
+
+from .compact import LETTERS
+
+
+@lru_cache(maxsize=None)
+def completion_count(open_letters, unused_letters):
+    """
+    Args:
+        open_letters: Integer, the number of letters occurring once.
+        unused_letters: Integer, the number of letters not yet occurring.
+    Returns:
+        The number of ways to complete a partial ascending order
+        double occurrence word, which is (2m + k)! / (2^m m!) for
+        k open and m unused letters.
+    """
+    return (factorial(2*unused_letters + open_letters)
+            // (2**unused_letters * factorial(unused_letters)))
+
+
+def dow_count(size):
+    """Returns (2*size - 1)!!, the number of words of size `size`."""
+    return completion_count(0, size)
+
+
+def rank_dow(word):
+    """
+    Args:
+        word: String or instance of Word, a double occurrence word
+            in ascending order.
+    Returns:
+        The number of ascending order double occurrence words of
+        the same size that precede word in lexicographic order.
+    """
+    size = len(word) // 2
+    open_letters = []
+    new_letter = 0
+    rank = 0
+    for letter in word:
+        code = LETTERS.find(letter)
+        if open_letters:
+            block_size = completion_count(
+                len(open_letters)-1, size-new_letter)
+        if code in open_letters:
+            rank += open_letters.index(code) * block_size
+            open_letters.remove(code)
+        elif code == new_letter and new_letter < size:
+            # Every choice of an open letter precedes the new letter.
+            if open_letters:
+                rank += len(open_letters) * block_size
+            open_letters.append(code)
+            new_letter += 1
+        else:
+            raise ValueError("Not a double occurrence word in ascending order!")
+    if open_letters or len(word) % 2:
+        raise ValueError("Not a double occurrence word in ascending order!")
+
+    return rank
+
+
+def unrank_dow(rank, size):
+    """
+    Args:
+        rank: Integer, in the range [0, dow_count(size)).
+        size: Integer.
+    Returns:
+        The ascending order double occurrence word of size `size` with
+        the given rank (see rank_dow), as a string.
+    """
+    if not 0 <= rank < dow_count(size):
+        raise ValueError("Rank out of range!")
+    elif size > len(LETTERS):
+        raise NotImplementedError("Need to expand allowed alphabets!")
+    open_letters = []
+    new_letter = 0
+    letters = []
+    for i in range(2*size):
+        if open_letters:
+            block_size = completion_count(
+                len(open_letters)-1, size-new_letter)
+        else:
+            block_size = 0
+        if rank < len(open_letters) * block_size:
+            code = open_letters.pop(rank // block_size)
+            rank %= block_size
+        else:
+            rank -= len(open_letters) * block_size
+            code = new_letter
+            open_letters.append(code)
+            new_letter += 1
+        letters.append(LETTERS[code])
+
+    return "".join(letters)
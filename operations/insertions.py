@@ -3,12 +3,16 @@ Tools for generating and manipulating insertions.
 
 Functions:
 
-    generate_insertions, find_adjacent_vertices, insertion
+    generate_insertions, generate_insertions_array, insertion_gather_indices, 
+    find_adjacent_vertices, find_insertion, is_insertion, insertion
 """
 
 from itertools import product, permutations
 
-from word_explorer.objects import Word
+import numpy as np
+
+from word_explorer.objects import Word, intern_word, canonical_form
+from word_explorer.objects.compact import LETTERS, WordArray
 
 
 def generate_insertions(word, pattern_instance, alphabet_size, 
@@ -37,9 +41,8 @@ def generate_insertions(word, pattern_instance, alphabet_size,
             alphabet_size = word.size + len(instance_letters)
         pattern_parts = pattern_instance.split("...")
         return_word = pattern_parts[0] == pattern_parts[1][::-1]
-        new_letters = list(range(1, alphabet_size + 1))
-        new_letters = [str(letter) for letter in new_letters 
-                       if str(letter) not in word]
+        new_letters = [letter for letter in LETTERS[:alphabet_size] 
+                       if letter not in word]
         instances = []
 
         for i, indices in enumerate(
@@ -60,20 +63,136 @@ def generate_insertions(word, pattern_instance, alphabet_size,
     for instance in instances:
         for i, j in product(range(len(word)+1), range(len(word)+1)):
             if i < j:
-                new_word = Word(word[:i] + instance[0] + word[i:j] 
-                                + instance[1] + word[j:], 
-                                double_occurrence=double_occurrence)
+                new_word = intern_word(word[:i] + instance[0] + word[i:j] 
+                                       + instance[1] + word[j:], 
+                                       double_occurrence=double_occurrence)
                 insertion_indices[new_word] = (i, j)
             else:
-                new_word = Word(word[:j] + instance[1] + word[j:i]
-                                + instance[0] + word[i:], 
-                                double_occurrence=double_occurrence)
+                new_word = intern_word(word[:j] + instance[1] + word[j:i]
+                                       + instance[0] + word[i:], 
+                                       double_occurrence=double_occurrence)
                 insertion_indices[new_word] = (j, i)
             insertions.add(new_word)
 
     return insertions, insertion_indices
 
 
+def insertion_gather_indices(length, part_length):
+    """
+    Args:
+        length: Integer, the length of a word.
+        part_length: Integer, the length of each factor of the inserted 
+            pattern instance.
+    Returns:
+        A 2D array containing a row for each pair (i, j) with 
+        0 <= i, j <= length, in the order of generate_insertions, and 
+        a 2D array whose row for (i, j) contains the indices of the 
+        letters of the corresponding insertion in the concatenation of 
+        the word, the first factor, and the second factor.
+    """
+    word_indices = np.arange(length)
+    first_part = np.arange(length, length+part_length)
+    second_part = np.arange(length+part_length, length+2*part_length)
+    index_pairs = []
+    gather_indices = []
+    for i, j in product(range(length+1), range(length+1)):
+        if i < j:
+            index_pairs.append((i, j))
+            gather_indices.append(np.concatenate(
+                (word_indices[:i], first_part, word_indices[i:j], 
+                 second_part, word_indices[j:])))
+        else:
+            index_pairs.append((j, i))
+            gather_indices.append(np.concatenate(
+                (word_indices[:j], second_part, word_indices[j:i], 
+                 first_part, word_indices[i:])))
+
+    return (np.array(index_pairs, dtype=np.intp).reshape(-1, 2), 
+            np.array(gather_indices, dtype=np.intp).reshape(
+                -1, length+2*part_length))
+
+
+def generate_insertions_array(word_array, pattern_instance, alphabet_size=None):
+    """
+    Args:
+        word_array: Instance of WordArray.
+        pattern_instance: String, a repeat or return word with two factors, 
+            e.g. "12...12" or "12...21".
+        alphabet_size: Integer, defaults to None. If not None, words 
+            requiring a letter beyond the first alphabet_size letters of 
+            LETTERS are skipped; otherwise, the full alphabet is used. 
+    Returns:
+        An instance of WordArray containing the distinct insertions 
+        of pattern_instance into each word of word_array, an array 
+        containing the row of word_array each insertion was constructed 
+        from, and a 2D array containing a pair of insertion indices for each 
+        insertion (see generate_insertions). The insertions of each word 
+        are sorted. As in generate_insertions with ascending_order = True, 
+        the letters of pattern_instance are relabeled, in sorted order, 
+        by the smallest letters not in the word.
+
+        Insertions are gathered in one array operation per word length, 
+        using the index arrays of insertion_gather_indices, and 
+        deduplicated with np.unique.
+    """
+    if alphabet_size is None:
+        alphabet_size = len(LETTERS)
+    pattern_parts = pattern_instance.split("...")
+    instance_letters = sorted(set("".join(pattern_parts)))
+    part_length = len(pattern_parts[0])
+    # Position of each letter of the factors in instance_letters
+    part_ranks = np.array(
+        [[instance_letters.index(letter) for letter in part] 
+         for part in pattern_parts], dtype=np.intp).reshape(2, part_length)
+
+    insertion_arrays = []
+    source_rows = []
+    index_pairs_list = []
+    for length in np.unique(word_array.lengths):
+        rows = np.flatnonzero(word_array.lengths == length)
+        codes = word_array.codes[rows, :length]
+        # Relabel the instance letters by the smallest unused letters.
+        present = np.zeros((len(rows), len(LETTERS)), dtype=bool)
+        present[np.arange(len(rows))[:, np.newaxis], codes] = True
+        unused = np.argsort(present, axis=1, 
+                            kind="stable")[:, :len(instance_letters)]
+        valid = (~np.take_along_axis(present, unused, axis=1)).all(axis=1)
+        valid &= (unused < alphabet_size).all(axis=1)
+        rows, codes, unused = rows[valid], codes[valid], unused[valid]
+        if not len(rows):
+            continue
+        sources = np.concatenate(
+            (codes, unused[:, part_ranks[0]], unused[:, part_ranks[1]]), 
+            axis=1).astype(np.uint8)
+        index_pairs, gather_indices = insertion_gather_indices(
+            int(length), part_length)
+        insertions = sources[:, gather_indices]   # (words, pairs, letters)
+        pair_count, new_length = gather_indices.shape
+
+        # Deduplicate the insertions of each word by sorting rows of 
+        # bytes prefixed with the (big-endian) row of the word.
+        keys = np.empty((len(rows), pair_count, 4 + new_length), 
+                        dtype=np.uint8)
+        keys[:, :, :4] = np.arange(len(rows), dtype=">u4").view(
+            np.uint8).reshape(-1, 1, 4)
+        keys[:, :, 4:] = insertions
+        keys = keys.reshape(-1, 4 + new_length)
+        _, first_indices = np.unique(
+            np.ascontiguousarray(keys).view(
+                np.dtype((np.void, 4 + new_length))).ravel(), 
+            return_index=True)
+        insertion_arrays.append(WordArray(
+            keys[first_indices, 4:], 
+            np.full(len(first_indices), new_length, dtype=np.uint16)))
+        source_rows.append(rows[first_indices // pair_count])
+        index_pairs_list.append(index_pairs[first_indices % pair_count])
+
+    return (WordArray.concatenate(insertion_arrays), 
+            np.concatenate(source_rows + [np.zeros(0, dtype=np.intp)]), 
+            np.concatenate(index_pairs_list 
+                           + [np.zeros((0, 2), dtype=np.intp)]))
+
+
 def find_adjacent_vertices(word, repeat_word, return_word):
     repeat_neighbors, repeat_insertion_indices = generate_insertions(
         word, repeat_word, None, ascending_order=True)
@@ -84,15 +203,72 @@ def find_adjacent_vertices(word, repeat_word, return_word):
             return_neighbors, return_insertion_indices)
 
 
-def insertion(word1, word2):
+def find_insertion(word1, word2, return_word=False):
+    """
+    Args:
+        word1: String or instance of Word, a double occurrence word.
+        word2: String or instance of Word, a double occurrence word.
+        return_word: Boolean, defaults to False. If True, looks for 
+            a return word instead of a repeat word.
+    Returns:
+        A pair of insertion indices (i, j), with i <= j, such that 
+        inserting the two factors of a repeat word (or return word) into 
+        word1 at indices i and j yields a word equivalent to word2, 
+        i.e. equal up to relabeling, or None if there is no such pair.
+
+        Instead of generating the insertions of word1, every factor of 
+        word2 consisting of the first occurrences of its letters is tested 
+        as the first factor of the inserted word; the second occurrences 
+        of its letters then have to form the second factor, and deleting 
+        both factors has to leave a word equivalent to word1. This takes 
+        O(n^2) time for words of length n.
+    """
+    insertion_length = len(word2) - len(word1)
+    if insertion_length <= 0 or insertion_length % 2:
+        return None
+    part_length = insertion_length // 2
+    first_positions = {}
+    second_positions = {}
+    for position, letter in enumerate(word2):
+        if letter in first_positions:
+            second_positions[letter] = position
+        else:
+            first_positions[letter] = position
+    word1_key = canonical_form(word1)
+    step = -1 if return_word else 1
+    for start in range(len(word2) - insertion_length + 1):
+        part = word2[start:start+part_length]
+        if any(first_positions[letter] != start + k 
+               for k, letter in enumerate(part)):
+            continue
+        second_start = second_positions.get(part[0], None)
+        if second_start is None or any(
+                second_positions.get(letter, None) != second_start + step*k 
+                for k, letter in enumerate(part)):
+            continue
+        if return_word:
+            second_start -= part_length - 1
+        if second_start < start + part_length:
+            continue
+        reduced_word = (word2[:start] 
+                        + word2[start+part_length:second_start] 
+                        + word2[second_start+part_length:])
+        if canonical_form(reduced_word) == word1_key:
+            return start, second_start - part_length
+
+    return None
+
+
+def is_insertion(word1, word2):
     """
     Args:
         word1: String, a double occurrence word.
         word2: String, a double occurrence word.
     Returns:
-        A boolean indicating whether word2 can be constructed by 
-        inserting a repeat word or return word into word1. If it can, 
-        then the two indices one of possible insertion are also returned. 
+        A boolean indicating whether a word equivalent to word2 can be 
+        constructed by inserting a repeat word or return word into word1 
+        (see find_insertion). If it can, then the two indices of one 
+        possible insertion are also returned. 
     """
     word1 = Word(word1)
     word2 = Word(word2)
@@ -101,22 +277,18 @@ def insertion(word1, word2):
     if len(word2) < len(word1):
         return False
     if len(word1) == len(word2):
-        return word1 == word2
+        return word1.canonical_key == word2.canonical_key
     else:
-        insertion_letters = list(set(word2) - set(word1))
-        insertion_letters.sort()
-        pattern_part = "".join(insertion_letters)
-        repeat_word = pattern_part + "..." + pattern_part
-        return_word = pattern_part + "..." + pattern_part[::-1]
-        (repeat_neighbors, repeat_insertion_indices, 
-         return_neighbors, return_insertion_indices) = find_adjacent_vertices(
-            word1, repeat_word, return_word)
-        if word2 in repeat_neighbors:
-            return True, repeat_insertion_indices[word2]
-        elif word2 in return_neighbors:
-            return True, return_insertion_indices[word2]
-        else:
-            return False
+        for return_word in (False, True):
+            insertion_indices = find_insertion(word1, word2, return_word)
+            if insertion_indices is not None:
+                return True, insertion_indices
+        return False
+
+
+def insertion(word1, word2):
+    """Same as is_insertion."""
+    return is_insertion(word1, word2)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,70 @@
+"""
+A memory-bounded cache of the deletions and insertions of pattern
+instances in words (see reduction_flipping.get_deletions and
+reduction_flipping.get_insertions), for reusing them when the same
+words are reached many times, e.g. while exploring paths or
+classifying the edges of many squares.
+
+Classes:
+
+    NeighborhoodCache
+
+Functions:
+
+    get_pattern_key
+"""
+
+import sys
+
+from word_explorer.io.caching import SpillingCache
+from .reduction_flipping import get_deletions, get_insertions
+
+
+def get_pattern_key(pattern):
+    """
+    Returns a hashable key identifying an instance of GeneralizedPattern
+    by its variables, reversals, and flags.
+    """
+    return (tuple(pattern), pattern.strict, pattern.literal)
+
+
+class NeighborhoodCache(SpillingCache):
+    """
+    A cache (see io.caching.SpillingCache) mapping a word, a pattern, and 
+    the type of operation to the list of words obtained by deleting or
+    inserting instances of the pattern in the word. Words are keyed by
+    their string, so their labels are preserved. Keeps at most roughly 
+    max_bytes bytes of neighbor lists in memory, as estimated by 
+    sys.getsizeof.
+
+    Methods:
+        get_deletions, get_insertions, entry_size
+    """
+
+    def __init__(self, max_bytes=2**28, file_name=None):
+        super().__init__(max_bytes, file_name)
+
+    def get_deletions(self, word, pattern):
+        """Cached version of reduction_flipping.get_deletions."""
+        key = ("deletions", str(word), get_pattern_key(pattern))
+        found, deletions = self.lookup(key)
+        if not found:
+            deletions = get_deletions(word, pattern)
+            self.store(key, deletions)
+        return deletions
+
+    def get_insertions(self, word, pattern, alphabet_size, max_word_length,
+                       pattern_instance_table=None):
+        """Cached version of reduction_flipping.get_insertions."""
+        key = ("insertions", str(word), get_pattern_key(pattern),
+               alphabet_size, max_word_length)
+        found, insertions = self.lookup(key)
+        if not found:
+            insertions = get_insertions(word, pattern, alphabet_size,
+                                        max_word_length, pattern_instance_table)
+            self.store(key, insertions)
+        return insertions
+
+    def entry_size(self, key, neighbors):
+        return (sys.getsizeof(key[1]) + sys.getsizeof(neighbors)
+                + sum(sys.getsizeof(neighbor) for neighbor in neighbors))
@@ -5,16 +5,24 @@ under which paths can be 'flipped'.
 
 Functions:
 
-    generate_pattern_instances, get_deletions, get_insertions, 
-    generate_paths, filter_paths, test_flipping
+    generate_pattern_instances, iterate_pattern_instances, 
+    extend_pattern_morphism, get_deletions, get_insertions, 
+    generate_paths, filter_paths, test_flipping, get_neighbors, 
+    explore_flipping_states, reconstruct_path, summarize_path_types, 
+    test_flipping_states, get_pattern_instances, initialize_sweep_worker, 
+    test_flipping_chunk, sweep_flipping
 """
 
-from itertools import product
+import os
+from itertools import product, islice
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 
 from word_explorer.objects import GeneralizedPattern, Word
+from word_explorer.objects.compact import LETTERS
 from word_explorer.objects.ascending_order import convert_to_ascending_order
 from .insertions import generate_insertions
 from word_explorer.objects.list_words import get_all_words
+from word_explorer.io import store_data, retrieve_data, format_filename
 
 
 def generate_pattern_instances(pattern, alphabet_size, max_length):
@@ -47,6 +55,72 @@ def generate_pattern_instances(pattern, alphabet_size, max_length):
     return pattern_instances
 
 
+def iterate_pattern_instances(pattern, alphabet_size, max_length):
+    """
+    Args:
+        pattern: An instance of GeneralizedPattern. 
+        alphabet_size: Integer. 
+        max_length: Integer.
+    Yields:
+        Every instance of pattern of length at most max_length constructed 
+        from alphabet {1, 2, ..., alphabet_size}, as a list of factors 
+        (see GeneralizedPattern.instance_from_morphism). Unlike 
+        generate_pattern_instances, nothing is held in memory, and the 
+        image of a variable occurring fewer times than others in pattern 
+        may be longer than max_length divided by the maximum number 
+        of repetitions of a variable.
+    """
+    if alphabet_size > len(LETTERS):
+        raise NotImplementedError("Need to expand allowed alphabets!")
+    variables = list(dict.fromkeys(pattern.variable_string))
+    repetitions = [pattern.variable_string.count(variable) 
+                   for variable in variables]
+    yield from extend_pattern_morphism(
+        pattern, LETTERS[:alphabet_size], variables, repetitions, 
+        max_length - sum(repetitions), {})
+
+
+def extend_pattern_morphism(pattern, alphabet, variables, repetitions, 
+                            extra_length, morphism):
+    """
+    Yields the instances of pattern extending morphism, which maps the 
+    first len(morphism) variables to their images, by assigning images 
+    to the remaining variables in order. extra_length is the number of 
+    letters that can still be added to the instance if every remaining 
+    variable has an image of length 1, so the extension is abandoned 
+    as soon as it is negative.
+    """
+    if extra_length < 0:
+        return
+    variable_index = len(morphism)
+    if variable_index == len(variables):
+        yield pattern.instance_from_morphism(morphism)
+        return
+    variable = variables[variable_index]
+    variable_repetitions = repetitions[variable_index]
+    for length in range(1, extra_length // variable_repetitions + 2):
+        for letters in product(alphabet, repeat=length):
+            morphism[variable] = "".join(letters)
+            yield from extend_pattern_morphism(
+                pattern, alphabet, variables, repetitions, 
+                extra_length - variable_repetitions*(length-1), morphism)
+    morphism.pop(variable, None)
+
+
+def get_pattern_instances(pattern_instance_table, pattern, 
+                          alphabet_size, max_length):
+    """
+    Returns pattern_instance_table[max_length], first computing it 
+    with iterate_pattern_instances if needed.
+    """
+    pattern_instances = pattern_instance_table.get(max_length, None)
+    if pattern_instances is None:
+        pattern_instances = list(iterate_pattern_instances(
+            pattern, alphabet_size, max_length))
+        pattern_instance_table[max_length] = pattern_instances
+    return pattern_instances
+
+
 def get_deletions(word, pattern):
     """
     Args:
@@ -60,13 +134,19 @@ def get_deletions(word, pattern):
     return [word.perform_reduction(instance) for instance in instance_indices]
 
 
-def get_insertions(word, pattern, alphabet_size, max_word_length):
+def get_insertions(word, pattern, alphabet_size, max_word_length, 
+                   pattern_instance_table=None):
     """
     Args:
         word: An instance of Word.
         pattern: An instance of GeneralizedPattern.
         alphabet_size: Integer.
         max_word_length: Integer.
+        pattern_instance_table: Dictionary, defaults to None. If not None, 
+            maps an integer n to a list of the pattern instances of length 
+            at most n (see iterate_pattern_instances); missing entries are 
+            computed and added. Otherwise, the instances are generated 
+            lazily and not stored.
     Returns:
         A list of all words of length at most max_word_length
         constructed from alphabet {1, 2, ..., alphabet_size} 
@@ -74,22 +154,26 @@ def get_insertions(word, pattern, alphabet_size, max_word_length):
     """
     insertions = set()
     if type(pattern) == GeneralizedPattern:
-        pattern_instances = generate_pattern_instances(
-            pattern, alphabet_size, max_word_length-len(word))
+        max_length = max_word_length - len(word)
+        if pattern_instance_table is None:
+            pattern_instances = iterate_pattern_instances(
+                pattern, alphabet_size, max_length)
+        else:
+            pattern_instances = get_pattern_instances(
+                pattern_instance_table, pattern, alphabet_size, max_length)
     else:
         raise NotImplementedError(
             "Pattern should be of type 'GeneralizedPattern'!")
     for pattern_instance in pattern_instances:
         instance_insertions, _ = generate_insertions(
-            word, pattern_instance, alphabet_size, 
-            Word, double_occurrence=False)
+            word, pattern_instance, alphabet_size, double_occurrence=False)
         insertions |= instance_insertions
 
     return list(insertions)
 
 
 def generate_paths(start_word, pattern, alphabet_size, 
-                   max_path_length, max_word_length):
+                   max_path_length, max_word_length, neighborhood_cache=None):
     """
     Args:
         start_word: An instance of Word.
@@ -97,6 +181,9 @@ def generate_paths(start_word, pattern, alphabet_size,
         alphabet_size: Integer.
         max_path_length: Integer.
         max_word_length: Integer. 
+        neighborhood_cache: Instance of NeighborhoodCache, defaults to None. 
+            If not None, used to look up the deletions and insertions 
+            of each word (see neighborhoods.NeighborhoodCache).
     Returns:
         A list of paths, where each path is implemented as a list of words.
     """
@@ -105,9 +192,15 @@ def generate_paths(start_word, pattern, alphabet_size,
         extended_paths = []
         for j, path in enumerate(paths):
             last_word = path[-1]
-            deletions = get_deletions(last_word, pattern)
-            insertions = get_insertions(last_word, pattern, 
-                                        alphabet_size, max_word_length)
+            if neighborhood_cache is None:
+                deletions = get_deletions(last_word, pattern)
+                insertions = get_insertions(last_word, pattern, 
+                                            alphabet_size, max_word_length)
+            else:
+                deletions = neighborhood_cache.get_deletions(
+                    last_word, pattern)
+                insertions = neighborhood_cache.get_insertions(
+                    last_word, pattern, alphabet_size, max_word_length)
             extended_paths.extend(
                 [path + [word] for word in deletions + insertions])
         paths.extend(extended_paths)
@@ -181,7 +274,293 @@ def test_flipping(start_word, pattern, alphabet_size, max_path_length,
     return paths, path_types, counterexamples
 
 
+# Path types of the states explored by explore_flipping_states: 
+# a path has no insertions, has insertions but no peak, or has a peak.
+DESCENDING, ASCENDING, PEAK = 0, 1, 2
+
+
+def get_neighbors(word, pattern, alphabet_size, max_word_length, 
+                  ascending_order=False, pattern_instance_table=None, 
+                  neighborhood_cache=None):
+    """
+    Returns a list of pairs (neighbor, inserted), one for each word 
+    obtained from word by deleting or inserting an instance of pattern 
+    (see get_deletions and get_insertions), where inserted indicates 
+    whether the neighbor is an insertion. If ascending_order = True, 
+    the neighbors are converted to ascending order. If neighborhood_cache 
+    is not None, the deletions and insertions are looked up in it.
+    """
+    if neighborhood_cache is None:
+        deletions = get_deletions(word, pattern)
+        insertions = get_insertions(word, pattern, alphabet_size, 
+                                    max_word_length, pattern_instance_table)
+    else:
+        deletions = neighborhood_cache.get_deletions(word, pattern)
+        insertions = neighborhood_cache.get_insertions(
+            word, pattern, alphabet_size, max_word_length, 
+            pattern_instance_table)
+    neighbors = [(deletion, False) for deletion in deletions]
+    neighbors.extend((insertion, True) for insertion in insertions)
+    if ascending_order:
+        neighbors = [(convert_to_ascending_order(neighbor), inserted) 
+                     for neighbor, inserted in neighbors]
+    return neighbors
+
+
+def explore_flipping_states(start_word, pattern, alphabet_size, 
+                            max_path_length, max_word_length, 
+                            ascending_order=False, pattern_instance_table=None, 
+                            neighborhood_cache=None):
+    """
+    Args:
+        start_word: An instance of Word.
+        pattern: An instance of GeneralizedPattern.
+        alphabet_size: Integer.
+        max_path_length: Integer.
+        max_word_length: Integer.
+        ascending_order: Boolean, defaults to False.
+        pattern_instance_table: Dictionary, defaults to None. 
+            See get_insertions; if None, a new dictionary is used.
+        neighborhood_cache: Instance of NeighborhoodCache, defaults to None. 
+            See get_neighbors.
+    Returns:
+        A dictionary mapping each state (word, path_type) reachable from 
+        start_word within max_path_length insertions and deletions of 
+        instances of pattern (see generate_paths) to its parent state on 
+        a shortest path, and a dictionary mapping each state to the 
+        length of that path, i.e. its number of words. The path type is 
+        DESCENDING if the path contains no insertions, ASCENDING if it 
+        contains insertions but has no peak (a word longer than both of 
+        its neighbors in the path), and PEAK otherwise. 
+
+        Unlike generate_paths, the search is breadth-first over states 
+        instead of paths: each state is visited once and only the current 
+        frontier and a parent pointer per state are kept, so memory is 
+        proportional to the number of distinct words rather than the 
+        number of paths. Paths may revisit words; in particular, if 
+        ascending_order = True, states are words in ascending order and 
+        shortest paths through them are used, whereas test_flipping 
+        discards converted paths containing a repeated word.
+    """
+    if pattern_instance_table is None:
+        pattern_instance_table = {}
+    if ascending_order:
+        start_word = convert_to_ascending_order(start_word)
+    start_state = (start_word, DESCENDING)
+    parents = {start_state: None}
+    path_lengths = {start_state: 1}
+    frontier = [start_state]
+    for path_length in range(2, max_path_length+2):
+        # Group the frontier by word, so that each word's 
+        # neighbors are computed once per level.
+        frontier_types = {}
+        for word, path_type in frontier:
+            frontier_types.setdefault(word, []).append(path_type)
+        next_frontier = []
+        for word, path_types in frontier_types.items():
+            neighbors = get_neighbors(word, pattern, alphabet_size, 
+                                      max_word_length, ascending_order, 
+                                      pattern_instance_table, 
+                                      neighborhood_cache)
+            for path_type in path_types:
+                for neighbor, inserted in neighbors:
+                    if inserted:
+                        next_type = PEAK if path_type == PEAK else ASCENDING
+                    else:
+                        next_type = (DESCENDING if path_type == DESCENDING 
+                                     else PEAK)
+                    state = (neighbor, next_type)
+                    if state not in parents:
+                        parents[state] = (word, path_type)
+                        path_lengths[state] = path_length
+                        next_frontier.append(state)
+        frontier = next_frontier
+
+    return parents, path_lengths
+
+
+def reconstruct_path(parents, state):
+    """
+    Returns the path of words leading to state, 
+    where parents is returned by explore_flipping_states.
+    """
+    path = []
+    while state is not None:
+        path.append(state[0])
+        state = parents[state]
+    return path[::-1]
+
+
+def summarize_path_types(path_lengths):
+    """
+    Returns a dictionary mapping each end word of the states in 
+    path_lengths (see explore_flipping_states) to a dictionary containing 
+    the minimum length of a path to it with and without a peak, 
+    under the keys "peak" and "no_peak"; a missing key means 
+    there is no such path.
+    """
+    path_types = {}
+    for (word, path_type), path_length in path_lengths.items():
+        key = "peak" if path_type == PEAK else "no_peak"
+        word_path_types = path_types.setdefault(word, {})
+        word_path_types[key] = min(word_path_types.get(key, path_length), 
+                                   path_length)
+    return path_types
+
+
+def test_flipping_states(start_word, pattern, alphabet_size, max_path_length, 
+                         max_word_length, ascending_order=False, 
+                         pattern_instance_table=None, neighborhood_cache=None):
+    """
+    Like test_flipping, but using explore_flipping_states. 
+
+    Returns:
+        The parents of the explored states (see explore_flipping_states), 
+        the path types of each end word (see summarize_path_types), and 
+        a list of counterexamples, i.e. end words such that every path to 
+        them has a peak, or some path with a peak is shorter than every 
+        path without one.
+    """
+    parents, path_lengths = explore_flipping_states(
+        start_word, pattern, alphabet_size, max_path_length, 
+        max_word_length, ascending_order, pattern_instance_table, 
+        neighborhood_cache)
+    path_types = summarize_path_types(path_lengths)
+    counterexamples = [
+        end_word for end_word, word_path_types in path_types.items() 
+        if "no_peak" not in word_path_types 
+        or word_path_types.get("peak", 100000) < word_path_types["no_peak"]]
+
+    return parents, path_types, counterexamples
+
+
+# Parameters of the sweep run by each sweep_flipping worker process, 
+# set by initialize_sweep_worker.
+_sweep_worker_parameters = {}
+
+
+def initialize_sweep_worker(pattern, alphabet_size, max_path_length, 
+                            max_word_length, ascending_order, 
+                            pattern_instance_table):
+    _sweep_worker_parameters.update(
+        pattern=pattern, alphabet_size=alphabet_size, 
+        max_path_length=max_path_length, max_word_length=max_word_length, 
+        ascending_order=ascending_order, 
+        pattern_instance_table=pattern_instance_table)
+
+
+def test_flipping_chunk(start_words):
+    """
+    Runs test_flipping_states on each of the strings start_words, with 
+    the parameters of the worker process (see initialize_sweep_worker). 
+    Returns a list of pairs containing each start word and the list of 
+    its counterexamples, as strings.
+    """
+    results = []
+    for start_word in start_words:
+        _, _, counterexamples = test_flipping_states(
+            Word(start_word, double_occurrence=False), 
+            **_sweep_worker_parameters)
+        results.append((start_word, [str(end_word) 
+                                     for end_word in counterexamples]))
+    return results
+
+
+def sweep_flipping(start_words, pattern, alphabet_size, max_path_length, 
+                   max_word_length, file_name, ascending_order=False, 
+                   checkpoint_file_name=None, max_workers=None, chunk_size=16):
+    """
+    Args:
+        start_words: Iterable containing strings or instances of Word, 
+            e.g. a word list or a generator from list_words.
+        pattern: An instance of GeneralizedPattern.
+        alphabet_size: Integer.
+        max_path_length: Integer.
+        max_word_length: Integer.
+        file_name: String. Each counterexample found is appended to this 
+            file as a line 'start_word: end_word' (see test_flipping_states), 
+            as soon as the chunk of start words containing it is tested. 
+            Lines already in the file are not written again, so a chunk 
+            tested again after an interruption adds no duplicates.
+        ascending_order: Boolean, defaults to False.
+        checkpoint_file_name: String, defaults to None. Once a chunk of 
+            start words is tested, they are appended to this file, one per 
+            line, and start words already listed in it are skipped; so an 
+            interrupted sweep is resumed by calling sweep_flipping again 
+            with the same arguments. If None, file_name + '.checkpoint' 
+            is used.
+        max_workers: Integer, defaults to None. Number of worker processes, 
+            defaults to the number of processors.
+        chunk_size: Integer, defaults to 16. Number of start words 
+            tested by a worker at a time.
+    Returns:
+        The number of start words tested and the number 
+        of counterexamples found by this call.
+
+    Each worker process keeps its own table of pattern instances for 
+    insertions (see get_pattern_instances), which only holds the instance 
+    lengths its start words need, instead of generating them again for 
+    every word of every path.
+    """
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    if checkpoint_file_name is None:
+        checkpoint_file_name = file_name + ".checkpoint"
+    tested_words = set()
+    if os.path.exists(format_filename(checkpoint_file_name)):
+        tested_words = set(line.rstrip("\n") for line 
+                           in retrieve_data(checkpoint_file_name))
+    # Counterexamples of start words not yet in the checkpoint may have 
+    # been stored before an interruption.
+    stored_lines = set()
+    if os.path.exists(format_filename(file_name)):
+        stored_lines = set(
+            line.rstrip("\n") for line in retrieve_data(file_name) 
+            if line.split(": ", 1)[0] not in tested_words)
+    untested_words = (str(start_word) for start_word in start_words 
+                      if str(start_word) not in tested_words)
+
+    counts = {"tested": 0, "counterexamples": 0}
+    def store_results(futures):
+        for future in futures:
+            results = future.result()
+            lines = [start_word + ": " + end_word 
+                     for start_word, counterexamples in results 
+                     for end_word in counterexamples]
+            store_data([line for line in lines if line not in stored_lines], 
+                       file_name, append=True)
+            store_data([start_word for start_word, _ in results], 
+                       checkpoint_file_name, append=True)
+            counts["tested"] += len(results)
+            counts["counterexamples"] += sum(
+                len(counterexamples) for _, counterexamples in results)
+
+    with ProcessPoolExecutor(
+            max_workers=max_workers, initializer=initialize_sweep_worker, 
+            initargs=(pattern, alphabet_size, max_path_length, 
+                      max_word_length, ascending_order, {})) as executor:
+        pending = set()
+        while True:
+            chunk = list(islice(untested_words, chunk_size))
+            if not chunk:
+                break
+            pending.add(executor.submit(test_flipping_chunk, chunk))
+            # Bound the number of chunks waiting to be tested.
+            if len(pending) >= 2*max_workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                store_results(done)
+        store_results(wait(pending).done)
+
+    return counts["tested"], counts["counterexamples"]
+
+
 if __name__ == '__main__':
     word = Word("1212", double_occurrence=False)
     pattern = GeneralizedPattern((("a", ""), ("a", "")))
-    test_flipping(word, pattern, 6, 3, 9, ascending_order=True)
+    parents, path_types, counterexamples = test_flipping_states(
+        word, pattern, 6, 3, 9, ascending_order=True)
+    for end_word in counterexamples:
+        print("Counterexample found:", end_word)
+    print("States:", len(parents))
+    print("End words:", len(path_types))
+    print("Counterexamples:", len(counterexamples))
@@ -0,0 +1,94 @@
+"""
+Simple timing benchmarks for the pattern_indices API. Expects to be run
+from the root folder of the library, so that the stored patterns can
+be found.
+
+Usage:
+
+	$ python -m word_explorer.pattern_indices.benchmarks
+
+Functions:
+
+	find_instances_by_combinations, benchmark_instance_finders
+"""
+
+from time import time
+
+from word_explorer.objects import (Word, find_pattern_instances,
+								   find_example_instances_by_combinations, 
+								   compile_pattern)
+from word_explorer.objects.list_words import sample_dows
+from .storage import StorageHandler
+
+
+def find_instances_by_combinations(word, pattern):
+	"""
+	Finds the instances of an instance of Pattern in word by testing every
+	combination of starting indices for each pattern example, for comparison.
+	"""
+	instances = []
+	sizes_found = set()
+	for i, example in enumerate(pattern):
+		dependencies = pattern.size_dependencies.get(i+1, set())
+		if any(j in dependencies and j not in sizes_found
+			   for j in range(2, i+1)):
+			continue
+		size_instances = find_example_instances_by_combinations(
+			word, example.split("..."))
+		if size_instances:
+			instances.extend(size_instances)
+			sizes_found.add(i+1)
+
+	return instances
+
+
+def benchmark_instance_finders(pattern_names=("Repeat word", "Return word"),
+							   sizes=range(4, 9), sample_size=20):
+	"""
+	Args:
+		pattern_names: Tuple, defaults to ("Repeat word", "Return word").
+			Names of stored patterns.
+		sizes: Iterable, defaults to range(4, 9). Word sizes.
+		sample_size: Integer, defaults to 20. Number of random words
+			of each size.
+	Returns:
+		A dictionary mapping each pattern name and word size to the running
+		times of find_pattern_instances and find_instances_by_combinations
+		on sample_size random words. Raises an AssertionError if the
+		two functions find different instances.
+	"""
+	storage_handler = StorageHandler()
+	times = {}
+	for pattern_name in pattern_names:
+		pattern = storage_handler.get_pattern(pattern_name)
+		for size in sizes:
+			words = [Word(word_string) for word_string
+					 in sample_dows(size, sample_size, seed=size).strings()]
+			# Compile the pattern and find its size dependencies 
+			# before timing, so only finding instances is measured.
+			compile_pattern(pattern)
+			find_pattern_instances(words[0], pattern)
+			start_time = time()
+			instances = [find_pattern_instances(word, pattern)
+						 for word in words]
+			indexed_time = time() - start_time
+			start_time = time()
+			combination_instances = [
+				find_instances_by_combinations(word, pattern)
+				for word in words]
+			combinations_time = time() - start_time
+			assert instances == combination_instances
+			times[(pattern_name, size)] = {
+				"indexed": indexed_time, "combinations": combinations_time}
+
+	return times
+
+
+if __name__ == '__main__':
+	times = benchmark_instance_finders()
+	for (pattern_name, size), pattern_times in times.items():
+		speedup = pattern_times["combinations"] / pattern_times["indexed"]
+		print(pattern_name + ", size " + str(size) + ":", "indexed",
+			  round(pattern_times["indexed"], 4), "s, combinations",
+			  round(pattern_times["combinations"], 4), "s, speedup",
+			  round(speedup, 2))
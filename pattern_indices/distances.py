@@ -0,0 +1,244 @@
+"""
+Calculates the distance between two double occurrence words with respect
+to a list of patterns, i.e. the minimum number of deletions of pattern
+instances needed to reduce the larger word to the smaller one, up to
+relabeling. The search runs from both words at once, deleting instances
+from the larger word and inserting them into the smaller one, until the
+two searches reach a common word.
+
+Classes:
+
+	DistanceCalculator
+
+Functions:
+
+	is_reversible_example, insert_example
+"""
+
+from time import perf_counter
+from itertools import combinations_with_replacement
+
+from word_explorer.objects import Word, compile_pattern
+from word_explorer.objects.compact import LETTERS
+from word_explorer.objects.ascending_order import ascending_order_string
+from word_explorer.operations.insertions import generate_insertions
+from .indices import Calculator
+
+
+def is_reversible_example(example_parts):
+	"""
+	Returns True if example_parts are the factors of a repeat or return
+	word example, e.g. ("12", "12") or ("12", "21"), whose insertions
+	operations.insertions.generate_insertions can generate.
+	"""
+	return (len(example_parts) == 2
+			and len(set(example_parts[0])) == len(example_parts[0])
+			and example_parts[1] in (example_parts[0], example_parts[0][::-1]))
+
+
+def insert_example(word, example_parts):
+	"""
+	Args:
+		word: String, a word in ascending order.
+		example_parts: Tuple of strings, the factors of a pattern example.
+	Returns:
+		A set containing the strings obtained by relabeling the example
+		with letters not in word and inserting its factors into word,
+		in order.
+	"""
+	example_letters = "".join(dict.fromkeys("".join(example_parts)))
+	new_letters = LETTERS[len(set(word)):len(set(word))+len(example_letters)]
+	relabeling = str.maketrans(example_letters, new_letters)
+	parts = [part.translate(relabeling) for part in example_parts]
+	insertions = set()
+	for positions in combinations_with_replacement(
+			range(len(word)+1), len(parts)):
+		pieces = []
+		start = 0
+		for position, part in zip(positions, parts):
+			pieces.append(word[start:position] + part)
+			start = position
+		pieces.append(word[start:])
+		insertions.add("".join(pieces))
+
+	return insertions
+
+
+class DistanceCalculator():
+	"""
+	A class for handling the calculation of the distance between two words.
+	The calculation can be halted with the method stop, which sets
+	stopped to True, and it is also halted once time_budget seconds have
+	passed, in which case timed_out is set to True. The number of words expanded by the
+	last calculation is stored in nodes_expanded.
+
+	Both searches are breadth-first over the canonical ascending order
+	forms of words, and each step expands a whole level of the smaller
+	frontier, so the first level at which the searches meet yields
+	the distance. The words of the search from the larger word are never
+	smaller than the smaller word and vice versa.
+
+	Methods:
+
+		stop, calculate_distance, expand_level, get_deletions,
+		get_insertions, reconstruct_path
+	"""
+
+	def __init__(self, time_budget=None):
+		self.stopped = False
+		self.time_budget = time_budget
+		self.timed_out = False
+		self.nodes_expanded = 0
+		self.calculator = Calculator()
+
+	def stop(self):
+		self.stopped = True
+
+	def calculate_distance(self, word1, word2, patterns, return_path=False):
+		"""
+		Args:
+			word1: An instance of Word.
+			word2: An instance of Word.
+			patterns: List of instances of Pattern.
+			return_path: Boolean, defaults to False.
+		Returns:
+			The distance between word1 and word2 with respect to patterns,
+			or None if neither can be reduced to the other. If return_path
+			= True, a list of words in ascending order on a shortest path
+			from word1 to word2, excluding word1, is also returned. As soon
+			as the calculation is stopped or runs out of time, returns None,
+			or (None, None) if return_path = True.
+		"""
+		patterns = [compile_pattern(pattern) for pattern in patterns]
+		letter_removal_used = any(pattern.letter_removal
+								  for pattern in patterns)
+		self.stopped = False
+		self.timed_out = False
+		self.nodes_expanded = 0
+		self.deadline = (None if self.time_budget is None
+						 else perf_counter() + self.time_budget)
+		reversed_path = len(word1) < len(word2)
+		if reversed_path:
+			word1, word2 = word2, word1
+		target_size = len(word2) // 2
+		start_size = len(word1) // 2
+
+		# Each search maps each word reached to its parent and depth.
+		forward_search = {ascending_order_string(word1): (None, 0)}
+		backward_search = {ascending_order_string(word2): (None, 0)}
+		forward_level = list(forward_search)
+		backward_level = list(backward_search)
+		meeting_word = None
+		if forward_level == backward_level:
+			meeting_word = forward_level[0]
+		while meeting_word is None and forward_level and backward_level:
+			if len(forward_level) <= len(backward_level):
+				forward_level, meeting_word = self.expand_level(
+					forward_level, forward_search, backward_search,
+					lambda word: self.get_deletions(
+						word, patterns, letter_removal_used, target_size))
+			else:
+				backward_level, meeting_word = self.expand_level(
+					backward_level, backward_search, forward_search,
+					lambda word: self.get_insertions(
+						word, patterns, start_size))
+			if self.stopped or self.timed_out:
+				return (None, None) if return_path else None
+
+		if meeting_word is None:
+			return (None, None) if return_path else None
+		distance = (forward_search[meeting_word][1]
+					+ backward_search[meeting_word][1])
+		if not return_path:
+			return distance
+		path = self.reconstruct_path(
+			meeting_word, forward_search, backward_search)
+		if reversed_path:
+			path.reverse()
+		return distance, [Word(word) for word in path[1:]]
+
+	def expand_level(self, level, search, other_search, get_neighbors):
+		"""
+		Expands every word of level, adding its neighbors to search.
+
+		Returns:
+			The list of new words and a word reached by both searches
+			with the smallest total depth, or None if there is none.
+		"""
+		next_level = []
+		meeting_word = None
+		for word in level:
+			self.nodes_expanded += 1
+			depth = search[word][1] + 1
+			for neighbor in get_neighbors(word):
+				if self.stopped:
+					return next_level, None
+				if neighbor in search:
+					continue
+				search[neighbor] = (word, depth)
+				next_level.append(neighbor)
+				if neighbor in other_search and (meeting_word is None
+						or other_search[neighbor][1]
+						< other_search[meeting_word][1]):
+					meeting_word = neighbor
+			if self.deadline is not None and perf_counter() > self.deadline:
+				self.timed_out = True
+				return next_level, None
+
+		return next_level, meeting_word
+
+	def get_deletions(self, word, patterns, letter_removal_used, min_size):
+		"""
+		Returns a set containing the words in ascending order obtained from
+		word by a single reduction (see Calculator.reduce_word), with at
+		least min_size letters.
+		"""
+		return {ascending_order_string(reduced_word) for reduced_word
+				in self.calculator.reduce_word(
+					Word(word), patterns, letter_removal_used)
+				if len(reduced_word) // 2 >= min_size}
+
+	def get_insertions(self, word, patterns, max_size):
+		"""
+		Returns a set containing the words in ascending order obtained
+		from word by inserting an instance of one of patterns, with at
+		most max_size letters.
+		"""
+		insertions = set()
+		word_size = len(word) // 2
+		for pattern in patterns:
+			if pattern.letter_removal:
+				examples = [("1", "1")]
+			else:
+				examples = pattern.example_parts
+			for example_parts in examples:
+				if word_size + len(set("".join(example_parts))) > max_size:
+					continue
+				if is_reversible_example(example_parts):
+					example_insertions, _ = generate_insertions(
+						Word(word), "...".join(example_parts), None,
+						ascending_order=True)
+				else:
+					example_insertions = insert_example(word, example_parts)
+				insertions.update(ascending_order_string(inserted_word)
+								  for inserted_word in example_insertions)
+
+		return insertions
+
+	def reconstruct_path(self, meeting_word, forward_search, backward_search):
+		"""
+		Returns the list of words on the path from the start of the forward
+		search to the start of the backward search through meeting_word.
+		"""
+		path = []
+		word = meeting_word
+		while word is not None:
+			path.append(word)
+			word = forward_search[word][0]
+		path.reverse()
+		word = backward_search[meeting_word][0]
+		while word is not None:
+			path.append(word)
+			word = backward_search[word][0]
+
+		return path
@@ -15,13 +15,16 @@ Classes:
 Functions:
 
 	output_instructions, output_choices, get_pattern_examples, 
-	get_user_input, filter_equivalent_reductions, 
-	contains_no_complete_reductions
+	get_user_input
 """
 
+from collections import OrderedDict
+
 from word_explorer.objects import (Pattern, Word, PatternIndex, 
-								   PatternExample, is_equivalent)
+								   PatternExample, is_equivalent, 
+								   compile_pattern)
 from .storage import StorageHandler
+from .memo import IndexMemo, get_pattern_set_key
 
 
 def output_instructions():
@@ -212,118 +215,335 @@ def get_user_input():
 	return word, patterns
 
 
-def filter_equivalent_reductions(reductions):
-	"""
-	Args:
-		reductions: List of reductions, where each reduction is 
-			a list of words. Assumes that each reduction is of the same length.
-	Returns: 
-		A filtered copy of reductions that does not contain two reductions 
-		with the same last word.
-	"""
-	# Remove identical words
-	reductions_equivalence_classes = {}
-	non_equivalent_reductions = set()
-	for i, reduction in enumerate(reductions):
-		new_value = reductions_equivalence_classes.get(reduction[-1], [])
-		new_value.append(i)
-		reductions_equivalence_classes[reduction[-1]] = new_value
-		non_equivalent_reductions.add(reduction[-1])
-
-	unique_reductions = []
-	for word in non_equivalent_reductions:
-		reduction_index = reductions_equivalence_classes[word][-1]
-		unique_reductions.append(reductions[reduction_index])
-
-	return unique_reductions
-
-def contains_no_complete_reductions(reductions):
-	"""Checks whether reductions contains a reduction with the empty word."""
-	for reduction in reductions:
-		if reduction[-1] == "":
-			return False
-	return True
-
 class Calculator():
 	"""
 	A class for handling the calculation of the pattern index of a given word.
 	Uses an instance method, stop, to add the option to halt 
 	the computation prematurely.
 
+	The pattern index is the minimum number of reductions needed to reach 
+	the empty word, so it is computed by a breadth-first search over 
+	words, one level of reductions at a time. Words equal up to relabeling 
+	have the same index, so each word is visited once, by its canonical 
+	form, and only the words of the current level are kept, together with 
+	a parent pointer for each visited word if a reduction sequence 
+	is requested.
+
+	calculate_pattern_index_informed instead runs an iterative deepening 
+	A* search, which only expands words whose depth plus a lower bound 
+	on their index is within a threshold. The number of words expanded 
+	by the last calculation is stored in nodes_expanded.
+
 	Methods:
 
-		stop, calculate_pattern_index
+		stop, calculate_pattern_index, calculate_pattern_index_informed, 
+		calculate_pattern_index_memoized, calculate_pattern_indices, 
+		calculate_memoized_index, search_bounded, reduce_greedily, 
+		reduce_word
 	"""
 
 	def __init__(self):
 		self.stop = False
+		self.nodes_expanded = 0
 
 	def stop(self):
 		self.stop = True
 
-	def calculate_pattern_index(self, word, patterns):
-		# Perform initial reductions.
-		letter_removal_used = False
-		reductions = []
-		for pattern in patterns:
-			if pattern.is_instance(["1", "1"], 1) and len(pattern) == 1:
-				letter_removal_used = True
-				for letter in set(word):
-					reduced_word = word.delete_letter(letter)
-					reductions.append([reduced_word])
-			else:
-				instances = word.find_instances(pattern)
-				for instance in instances:
-					# If equivalent to letter removal
-					if len(instance) == 2 and letter_removal_used:	
+	def calculate_pattern_index(self, word, patterns, return_reduction=False):
+		"""
+		Args:
+			word: An instance of Word.
+			patterns: List of instances of Pattern.
+			return_reduction: Boolean, defaults to False.
+		Returns:
+			The pattern index of word with respect to patterns, or None 
+			if the empty word cannot be reached. If return_reduction = True, 
+			a list of words from a reduction of word to the empty word of 
+			minimal length, excluding word itself, is also returned. 
+			As soon as the calculation is stopped, returns None, or 
+			(None, None) if return_reduction = True.
+		"""
+		# Compile the patterns once for every word of every reduction.
+		patterns = [compile_pattern(pattern) for pattern in patterns]
+		letter_removal_used = any(pattern.letter_removal 
+								  for pattern in patterns)
+		parents = {word.canonical_key: None} if return_reduction else None
+		visited = {word.canonical_key}
+		level = [word]
+		depth = 0
+		self.nodes_expanded = 0
+		while level and word != "":
+			if self.stop == True:
+				return (None, None) if return_reduction else None
+			depth += 1
+			next_level = []
+			for current_word in level:
+				self.nodes_expanded += 1
+				for reduced_word in self.reduce_word(
+						current_word, patterns, letter_removal_used):
+					if self.stop == True:
+						return (None, None) if return_reduction else None
+					key = reduced_word.canonical_key
+					if key in visited:
 						continue
-					reduced_word = word.perform_reduction(instance)
-					reductions.append([reduced_word])
+					visited.add(key)
+					if return_reduction:
+						parents[key] = (reduced_word, current_word.canonical_key)
+					if reduced_word == "":
+						if not return_reduction:
+							return depth
+						reduction = []
+						while parents[key] is not None:
+							reduced_word, key = parents[key]
+							reduction.append(reduced_word)
+						return depth, reduction[::-1]
+					next_level.append(reduced_word)
+			level = next_level
+
+		if word == "":
+			return (0, []) if return_reduction else 0
+		return (None, None) if return_reduction else None
+
+	def calculate_pattern_index_informed(self, word, patterns, 
+										 return_reduction=False, 
+										 max_table_entries=2**16):
+		"""
+		Args:
+			word: An instance of Word.
+			patterns: List of instances of Pattern.
+			return_reduction: Boolean, defaults to False.
+			max_table_entries: Integer, defaults to 2**16. Maximum number 
+				of words in the transposition table (see search_bounded), 
+				from which the least recently used ones are evicted.
+		Returns:
+			The same as calculate_pattern_index, using iterative deepening 
+			A* search. A reduction deletes at most as many letters as the 
+			largest example of a pattern has, so the number of letters of 
+			a word divided by that, rounded up, is a lower bound on its 
+			index. The length of a greedy reduction (see reduce_greedily) 
+			is an upper bound, so thresholds only increase while they are 
+			below it, and if none succeeds the greedy reduction is minimal. 
+			No threshold above the number of letters of word is needed, 
+			since each reduction deletes at least one letter.
+		"""
+		patterns = [compile_pattern(pattern) for pattern in patterns]
+		letter_removal_used = any(pattern.letter_removal 
+								  for pattern in patterns)
+		max_removed = max((1 if pattern.letter_removal else max(
+			len(set(example)) for example in pattern.joined_examples))
+			for pattern in patterns)
+		def lower_bound(word):
+			return -(-(len(word) // 2) // max_removed)
+
+		self.nodes_expanded = 0
+		if word == "":
+			return (0, []) if return_reduction else 0
+
+		upper_bound, greedy_reduction = self.reduce_greedily(
+			word, patterns, letter_removal_used)
+		if self.stop == True:
+			return (None, None) if return_reduction else None
+		threshold = lower_bound(word)
+		budgets = OrderedDict()
+		while threshold is not None and threshold <= len(word) // 2 and (
+				upper_bound is None or threshold < upper_bound):
+			reduction = []
+			found, threshold = self.search_bounded(
+				word, 0, threshold, patterns, letter_removal_used, 
+				lower_bound, budgets, max_table_entries, reduction)
+			if self.stop == True:
+				return (None, None) if return_reduction else None
+			if found:
+				upper_bound, greedy_reduction = len(reduction), reduction[::-1]
+				break
 
-		# Iteratively reduce until a reduction achieves the empty word.
-		while contains_no_complete_reductions(reductions):
+		if return_reduction:
+			return upper_bound, greedy_reduction
+		return upper_bound
+
+	def search_bounded(self, word, depth, threshold, patterns, 
+					   letter_removal_used, lower_bound, budgets, 
+					   max_table_entries, reduction):
+		"""
+		Depth-first search for the empty word from word, reached at depth 
+		`depth`, through words whose depth plus lower bound is at most 
+		threshold. budgets is a transposition table mapping the canonical 
+		form of words searched so far, in this or an earlier search, to 
+		the largest number of reductions it was searched with. Since every 
+		such search failed, a word is pruned unless it has more reductions 
+		left now. At most max_table_entries words are kept, evicting the 
+		least recently used ones, which only makes pruning less effective. 
+		Reductions are found again whenever a word is expanded, so memory 
+		use stays proportional to the search depth and the table size. 
+
+		Returns:
+			A boolean indicating whether the empty word was found, in which 
+			case the reduction is appended to reduction in reverse order, 
+			and otherwise the smallest depth plus lower bound that exceeded 
+			threshold, or None if there was none.
+		"""
+		self.nodes_expanded += 1
+		next_threshold = None
+		reduced_words = sorted(
+			self.reduce_word(word, patterns, letter_removal_used), key=len)
+		for reduced_word in reduced_words:
+			if self.stop == True:
+				return False, None
+			if reduced_word == "":
+				reduction.append(reduced_word)
+				return True, None
+			bound = depth + 1 + lower_bound(reduced_word)
+			if bound > threshold:
+				if next_threshold is None or bound < next_threshold:
+					next_threshold = bound
+				continue
+			key = reduced_word.canonical_key
+			budget = budgets.get(key, -1)
+			if budget != -1:
+				budgets.move_to_end(key)
+			if budget >= threshold - depth - 1:
+				# Searching it again can only help with a larger budget.
+				bound = depth + 2 + budget
+				if next_threshold is None or bound < next_threshold:
+					next_threshold = bound
+				continue
+			budgets[key] = threshold - depth - 1
+			budgets.move_to_end(key)
+			if len(budgets) > max_table_entries:
+				budgets.popitem(last=False)
+			found, reduced_threshold = self.search_bounded(
+				reduced_word, depth+1, threshold, patterns, 
+				letter_removal_used, lower_bound, budgets, 
+				max_table_entries, reduction)
+			if found:
+				reduction.append(reduced_word)
+				return True, None
+			if reduced_threshold is not None and (
+					next_threshold is None or reduced_threshold < next_threshold):
+				next_threshold = reduced_threshold
+
+		return False, next_threshold
+
+	def reduce_greedily(self, word, patterns, letter_removal_used):
+		"""
+		Returns the length of the reduction of word obtained by always 
+		choosing a shortest reduced word, and the reduction, excluding 
+		word itself, or None and None if it does not reach the empty word.
+		"""
+		reduction = []
+		while word != "":
+			self.nodes_expanded += 1
+			word = min(self.reduce_word(word, patterns, letter_removal_used), 
+					   key=len, default=None)
+			if word is None or self.stop == True:
+				return None, None
+			reduction.append(word)
+
+		return len(reduction), reduction
+
+	def calculate_pattern_index_memoized(self, word, patterns, memo=None):
+		"""
+		Args:
+			word: An instance of Word.
+			patterns: List of instances of Pattern.
+			memo: Instance of IndexMemo, defaults to None. If None, 
+				a new in-memory instance is used.
+		Returns:
+			The pattern index of word with respect to patterns, or None if 
+			the empty word cannot be reached or the calculation is stopped. 
+
+			Uses the recursion index(w) = 1 + min(index(r)), over the 
+			reductions r of w, storing the index of every word reached in 
+			memo, so that calculations for other words, e.g. in a batch, 
+			can reuse them. Unlike calculate_pattern_index, every word 
+			reachable from word is visited, unless already in memo.
+		"""
+		if memo is None:
+			memo = IndexMemo()
+		patterns = [compile_pattern(pattern) for pattern in patterns]
+		letter_removal_used = any(pattern.letter_removal 
+								  for pattern in patterns)
+		return self.calculate_memoized_index(
+			word, patterns, letter_removal_used, 
+			get_pattern_set_key(patterns), memo)
+
+	def calculate_pattern_indices(self, words, patterns, memo=None):
+		"""
+		Returns a list containing the pattern index of each word of words 
+		(see calculate_pattern_index_memoized), all sharing one memo table, 
+		or None if the calculation is stopped.
+		"""
+		if memo is None:
+			memo = IndexMemo()
+		index_values = []
+		for word in words:
+			index_values.append(
+				self.calculate_pattern_index_memoized(word, patterns, memo))
 			if self.stop == True:
 				return
-			# Remove all but 1 from each "equivalence class" of reductions.
-			# Works since all reductions here are of the same size.
-			reductions = filter_equivalent_reductions(reductions)
+		return index_values
+
+	def calculate_memoized_index(self, word, patterns, letter_removal_used, 
+								 pattern_set_key, memo):
+		"""
+		Args:
+			word: An instance of Word.
+			patterns: List of instances of PatternMatcher 
+				(see compile_pattern).
+			letter_removal_used: Boolean, whether one of patterns 
+				is letter removal (see reduce_word).
+			pattern_set_key: Tuple, the key of patterns in memo 
+				(see memo.get_pattern_set_key).
+			memo: Instance of IndexMemo.
+		Returns:
+			The pattern index of word with respect to patterns, or None 
+			if the empty word cannot be reached or the calculation is 
+			stopped, looking up and storing the index of word and every 
+			word reached from it in memo.
+		"""
+		if word == "":
+			return 0
+		found, index_value = memo.get_index(
+			pattern_set_key, word.canonical_key)
+		if found:
+			return index_value
+		for reduced_word in self.reduce_word(
+				word, patterns, letter_removal_used):
+			if reduced_word == "":
+				index_value = 1
+				break
+			reduced_index = self.calculate_memoized_index(
+				reduced_word, patterns, letter_removal_used, 
+				pattern_set_key, memo)
 			if self.stop == True:
+				# Partial results are not stored.
 				return
-
-			# Now continue finding new reductions
-			reductions_current = reductions[:]
-			for i, reduction in enumerate(reductions_current):
-				initial_reduction_size = len(reduction)
-				for pattern in patterns:
-					if pattern.is_instance(["1", "1"], 1) \
-					and len(pattern) == 1:
-						for j, letter in enumerate(set(reduction[-1])):
-							if self.stop == True:
-								return
-							reduced_word = reduction[-1].delete_letter(letter)
-							new_reduction = reduction[:]
-							new_reduction.append(reduced_word)
-							if len(reductions[i]) == initial_reduction_size:
-								reductions[i] = new_reduction
-							else:
-								reductions.append(new_reduction)
-					else:
-						instances = reduction[-1].find_instances(pattern)
-						for j, instance in enumerate(instances):
-							if self.stop == True:
-								return
-							# If equivalent to letter removal
-							if len(instance) == 2 and letter_removal_used:	
-								continue
-							reduced_word = reduction[-1].perform_reduction(instance)
-							new_reduction = reduction[:]
-							new_reduction.append(reduced_word)
-							if len(reductions[i]) == initial_reduction_size:
-								reductions[i] = new_reduction
-							else:
-								reductions.append(new_reduction)
-
-		return min(map(len, reductions))
+			if reduced_index is not None and (
+					index_value is None or reduced_index + 1 < index_value):
+				index_value = reduced_index + 1
+		memo.store_index(pattern_set_key, word.canonical_key, index_value)
+		return index_value
+
+	def reduce_word(self, word, patterns, letter_removal_used):
+		"""
+		Yields the words obtained from word by a single reduction, i.e. 
+		deleting a letter, if one of the compiled patterns is letter 
+		removal, or an instance of one of the patterns. Instances of 
+		size 1 are skipped if letter_removal_used = True, since they 
+		are equivalent to deleting a letter, and so are reductions that 
+		are not double occurrence words.
+		"""
+		for pattern in patterns:
+			if pattern.letter_removal:
+				for letter in set(word):
+					yield word.delete_letter(letter)
+			else:
+				for instance in pattern.find_instances(word):
+					if len(instance) == 2 and letter_removal_used:
+						continue
+					reduced_word = word.perform_reduction(instance)
+					if reduced_word is not None:
+						yield reduced_word
 
 
 if __name__ == '__main__':
@@ -0,0 +1,53 @@
+"""
+A persistent memo table for pattern index values. The pattern index
+of a word only depends on the word up to relabeling and on the patterns,
+so values are keyed by the canonical form of the word (see
+objects.canonical_form) and the patterns, and can be shared by every
+word whose reductions reach the same words.
+
+Classes:
+
+	IndexMemo
+
+Functions:
+
+	get_pattern_set_key
+"""
+
+from word_explorer.io.caching import SpillingCache
+from word_explorer.objects import compile_pattern
+
+
+def get_pattern_set_key(patterns):
+	"""
+	Returns a hashable key identifying a list of instances of Pattern
+	(or PatternMatcher) by their names and examples, independent of order.
+	"""
+	return tuple(sorted(
+		(pattern.name, pattern.example_parts)
+		for pattern in map(compile_pattern, patterns)))
+
+
+class IndexMemo(SpillingCache):
+	"""
+	A cache (see io.caching.SpillingCache) mapping a pattern set key 
+	(see get_pattern_set_key) and the canonical form of a word to the 
+	pattern index of the word, where None means that the empty word 
+	cannot be reached. Keeps at most max_entries values in memory.
+
+	Methods:
+		get_index, store_index
+	"""
+
+	def __init__(self, max_entries=2**20, file_name=None):
+		super().__init__(max_entries, file_name)
+
+	def get_index(self, pattern_set_key, canonical_key):
+		"""
+		Returns a boolean indicating whether a value is stored for
+		the given keys, and the value, or None if there is none.
+		"""
+		return self.lookup((pattern_set_key, canonical_key))
+
+	def store_index(self, pattern_set_key, canonical_key, index_value):
+		self.store((pattern_set_key, canonical_key), index_value)
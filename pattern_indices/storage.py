@@ -9,17 +9,51 @@ Classes:
 
 	StorageHandler, SQLStorageHandler, StoredPattern, StoredPatternIndex, 
 	StoredWord, Value
+
+Functions:
+
+	get_index_table_file_name
 """
 
+import os
 import re
 
+from hashlib import sha1
+
+import numpy as np
+
 from word_explorer.objects import (Pattern, PatternExample, 
 								   PatternIndex, is_equivalent)
+from word_explorer.objects.ranking import rank_dow
+from word_explorer.objects.ascending_order import ascending_order_string
+from .memo import get_pattern_set_key
 
 PATTERN_STORE = "pattern_indices/data/patterns.txt"
 REDUCTION_STORE = "pattern_indices/data/reduction_operations.txt"
 INDEX_STORE = "pattern_indices/data/pattern_indices.txt"
 WORD_STORE = "pattern_indices/data/word_indices.txt"
+INDEX_TABLE_STORE = "pattern_indices/data/index_tables"
+
+# Value of an index table entry for a word that cannot be reduced 
+# to the empty word.
+UNREACHABLE_INDEX = 255
+
+
+def get_index_table_file_name(patterns, size, 
+							  index_table_store=INDEX_TABLE_STORE):
+	"""
+	Returns the name of the file containing the index table of the 
+	double occurrence words of size `size` with respect to the list of 
+	instances of Pattern patterns (see tables.build_index_tables). The 
+	name ends with a digest of the names and examples of the patterns 
+	(see memo.get_pattern_set_key), so redefining a pattern under the 
+	same name does not reuse its old tables.
+	"""
+	pattern_names = sorted(pattern.name.lower().replace(" ", "_") 
+						   for pattern in patterns)
+	digest = sha1(repr(get_pattern_set_key(patterns)).encode()).hexdigest()
+	return os.path.join(index_table_store, "-".join(pattern_names) 
+		+ "_" + digest[:12] + "_size" + str(size) + ".npy")
 
 
 class StorageHandler():
@@ -29,22 +63,27 @@ class StorageHandler():
 	been found. By default, expects the existence of global strings 
 	PATTERN_STORE, REDUCTION_STORE, INDEX_STORE, and WORD_STORE specifying 
 	the names of the pattern, reduction operation, pattern index, and 
-	word storage text files.
+	word storage text files. Index values are first looked up in the 
+	index tables in the folder INDEX_TABLE_STORE, if there is one for 
+	the patterns and the size of the word.
 
 	Methods:
 		store_pattern, store_pattern_example, store_reduction
 		store_index, store_word_index, get_pattern, get_reduction
-		get_index, get_word_index, get_pattern_names, get_reduction_names
-		get_index_names
+		get_index, get_word_index, get_index_table, get_table_word_index,
+		get_pattern_names, get_reduction_names, get_index_names
 	"""
 
 	def __init__(self, pattern_store=PATTERN_STORE, 
 				 reduction_store=REDUCTION_STORE,
-				 index_store=INDEX_STORE, word_store=WORD_STORE):
+				 index_store=INDEX_STORE, word_store=WORD_STORE, 
+				 index_table_store=INDEX_TABLE_STORE):
 		self.pattern_store = pattern_store
 		self.reduction_store = reduction_store
 		self.index_store = index_store
 		self.word_store = word_store
+		self.index_table_store = index_table_store
+		self.index_tables = {}
 
 	def store_pattern(self, pattern):
 		with open(self.pattern_store, "a") as pattern_store:
@@ -202,6 +241,11 @@ class StorageHandler():
 		if bool(patterns) == bool(index):
 			raise ValueError("Requires exactly one keyword " 
 							 + "argument among pattern and index.")
+		if reductions is None:
+			found, index_value = self.get_table_word_index(
+				word, patterns if index is None else index.patterns)
+			if found:
+				return index_value
 		found = False
 		try:
 			with open(self.word_store, "r") as word_store:
@@ -241,6 +285,43 @@ class StorageHandler():
 
 		return None
 
+	def get_index_table(self, patterns, size):
+		"""
+		Returns the index table of the words of size `size` with respect 
+		to the list of instances of Pattern patterns, as a read-only 
+		memory-mapped array indexed by rank (see objects.ranking), or None 
+		if it has not been built. Opened tables, and tables found to be 
+		missing, are kept for later lookups.
+		"""
+		table_key = (get_pattern_set_key(patterns), size)
+		if table_key not in self.index_tables:
+			file_name = get_index_table_file_name(
+				patterns, size, self.index_table_store)
+			try:
+				self.index_tables[table_key] = np.load(
+					file_name, mmap_mode="r")
+			except FileNotFoundError:
+				self.index_tables[table_key] = None
+		return self.index_tables[table_key]
+
+	def get_table_word_index(self, word, patterns):
+		"""
+		Returns a boolean indicating whether the index value of word is 
+		in an index table, and the value, which is None if word cannot be 
+		reduced to the empty word or there is no table.
+		"""
+		index_table = self.get_index_table(patterns, len(word) // 2)
+		if index_table is None:
+			return False, None
+		word = ascending_order_string(str(word))
+		try:
+			index_value = int(index_table[rank_dow(word)])
+		except ValueError:	# Not a double occurrence word
+			return False, None
+		if index_value == UNREACHABLE_INDEX:
+			return True, None
+		return True, index_value
+
 	def get_pattern_names(self):
 		pattern_names = []
 		try:
@@ -0,0 +1,116 @@
+"""
+Builds tables of the pattern index values of every double occurrence
+word up to a given size. Words are processed in order of size, and the
+table of each size is an array indexed by the rank of a word in
+ascending order (see objects.ranking), whose entry for a word is 1 plus
+the minimum of the entries of its reductions, which are all smaller and
+so already in a table. Each table is saved to a .npy file that
+StorageHandler.get_word_index reads with memory mapping.
+
+Usage:
+
+	$ python -m word_explorer.pattern_indices.tables max_size pattern_name ...
+
+Functions:
+
+	build_index_table, build_index_tables
+"""
+
+import os
+import sys
+
+import numpy as np
+
+from word_explorer.objects import Word, compile_pattern
+from word_explorer.objects.ranking import dow_count, rank_dow, unrank_dow
+from word_explorer.objects.ascending_order import ascending_order_string
+from .indices import Calculator
+from .storage import (StorageHandler, INDEX_TABLE_STORE, UNREACHABLE_INDEX,
+					  get_index_table_file_name)
+
+
+def build_index_table(size, patterns, smaller_tables, file_name=None):
+	"""
+	Args:
+		size: Integer.
+		patterns: List of instances of Pattern.
+		smaller_tables: List of arrays, whose ith element is the index
+			table of the words of size i+1, for i < size-1.
+		file_name: String, defaults to None. If given, the table is
+			written to a .npy file with this name.
+	Returns:
+		A 1D array of unsigned 8-bit integers whose ith element is the
+		pattern index of the word of size `size` with rank i, or
+		UNREACHABLE_INDEX if the empty word cannot be reached.
+	"""
+	calculator = Calculator()
+	patterns = [compile_pattern(pattern) for pattern in patterns]
+	letter_removal_used = any(pattern.letter_removal for pattern in patterns)
+	if file_name is None:
+		index_table = np.empty(dow_count(size), dtype=np.uint8)
+	else:
+		index_table = np.lib.format.open_memmap(
+			file_name, mode="w+", dtype=np.uint8, shape=(dow_count(size),))
+	for rank in range(len(index_table)):
+		word = Word(unrank_dow(rank, size))
+		index_value = UNREACHABLE_INDEX
+		for reduced_word in calculator.reduce_word(
+				word, patterns, letter_removal_used):
+			if reduced_word == "":
+				index_value = 1
+				break
+			reduced_string = ascending_order_string(reduced_word)
+			reduced_index = int(smaller_tables[len(reduced_string)//2 - 1][
+				rank_dow(reduced_string)])
+			if reduced_index != UNREACHABLE_INDEX:
+				index_value = min(index_value, reduced_index + 1)
+		index_table[rank] = index_value
+	if file_name is not None:
+		index_table.flush()
+
+	return index_table
+
+
+def build_index_tables(max_size, patterns,
+					   index_table_store=INDEX_TABLE_STORE):
+	"""
+	Args:
+		max_size: Integer.
+		patterns: List of instances of Pattern.
+		index_table_store: String, defaults to INDEX_TABLE_STORE. Folder
+			in which to save the tables.
+	Returns:
+		A list whose ith element is the index table of the words of
+		size i+1 (see build_index_table). Tables that already exist
+		in index_table_store for the same pattern names and examples
+		(see storage.get_index_table_file_name) are loaded instead
+		of rebuilt.
+	"""
+	os.makedirs(index_table_store, exist_ok=True)
+	index_tables = []
+	for size in range(1, max_size+1):
+		file_name = get_index_table_file_name(
+			patterns, size, index_table_store)
+		if os.path.exists(file_name):
+			index_tables.append(np.load(file_name, mmap_mode="r"))
+			continue
+		# Built under a temporary name, so a partial table is never read.
+		partial_file_name = file_name[:-len(".npy")] + "_partial.npy"
+		build_index_table(size, patterns, index_tables, partial_file_name)
+		os.replace(partial_file_name, file_name)
+		index_tables.append(np.load(file_name, mmap_mode="r"))
+
+	return index_tables
+
+
+if __name__ == '__main__':
+	storage_handler = StorageHandler()
+	max_size = int(sys.argv[1])
+	patterns = [storage_handler.get_pattern(pattern_name)
+				for pattern_name in sys.argv[2:]]
+	if any(pattern is None for pattern in patterns):
+		raise ValueError("Pattern not found!")
+	for size, index_table in enumerate(
+			build_index_tables(max_size, patterns), start=1):
+		print("Size", str(size) + ":", len(index_table), "words, maximum index",
+			  index_table[index_table != UNREACHABLE_INDEX].max(initial=0))
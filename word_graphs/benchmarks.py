@@ -0,0 +1,90 @@
+"""
+Simple timing benchmarks for the word graph algorithms.
+
+Usage:
+
+    $ python -m word_explorer.word_graphs.benchmarks
+
+Functions:
+
+    benchmark_find_squares
+"""
+
+from time import time
+
+from word_explorer.objects import Word, is_equivalent
+from word_explorer.objects.list_words import get_dows
+from .word_graphs import WordGraph, expand_word_graph
+from .subgraphs import find_squares
+
+
+class UncachedWord(Word):
+    """
+    A Word that recomputes its letter positions on every hash and
+    uses is_equivalent for every equality check, for comparison.
+    """
+
+    def __eq__(self, other):
+        if not self.ascending_order or self.optimize:
+            return str(self) == str(other)
+        elif other is None:
+            return False
+        else:
+            return is_equivalent(self, other)
+
+    def __hash__(self):
+        if self.ascending_order or not self.optimize:
+            letter_indices = {}
+            for i, letter in enumerate(self):
+                letter_indices.setdefault(letter, []).append(i)
+            return hash(tuple(tuple(index_list) for index_list
+                              in letter_indices.values()))
+        else:
+            return hash(str(self))
+
+
+def rebuild_word_graph(word_graph, word_class):
+    """Returns a copy of word_graph with fresh instances of word_class."""
+    def rebuild(word):
+        return word_class(str(word), double_occurrence=False,
+                          ascending_order=word.ascending_order,
+                          optimize=word.optimize)
+
+    return {rebuild(word): {rebuild(neighbor) for neighbor in neighbors}
+            for word, neighbors in word_graph.items()}
+
+
+def benchmark_find_squares(size, repetitions=3):
+    """
+    Args:
+        size: Integer, the maximum size of the words in the word graph.
+        repetitions: Integer, defaults to 3.
+    Returns:
+        A dictionary containing the best running time of find_squares
+        using instances of Word and of UncachedWord, and the speedup.
+    """
+    words = get_dows(size)
+    word_graph = expand_word_graph(WordGraph(
+        words, size_limit=size, ascending_order=True).directed_neighborhoods)
+    times = {}
+    for name, word_class in [("cached", Word), ("uncached", UncachedWord)]:
+        best_time = None
+        for i in range(repetitions):
+            # Rebuild the words so that no canonical keys are cached yet.
+            graph_copy = rebuild_word_graph(word_graph, word_class)
+            start_time = time()
+            find_squares(graph_copy)
+            elapsed_time = time() - start_time
+            if best_time is None or elapsed_time < best_time:
+                best_time = elapsed_time
+        times[name] = best_time
+    times["speedup"] = times["uncached"] / times["cached"]
+    return times
+
+
+if __name__ == '__main__':
+    for size in range(2, 5):
+        times = benchmark_find_squares(size)
+        print("Size", str(size) + ":", "cached", round(times["cached"], 4),
+              "s, uncached", round(times["uncached"], 4), "s, speedup",
+              round(times["speedup"], 2))
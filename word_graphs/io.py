@@ -15,7 +15,7 @@ import os
 import re
 from itertools import chain
 
-from word_explorer.objects import Word
+from word_explorer.objects import intern_word
 from word_explorer.io import store_data, retrieve_data
 
 
@@ -90,8 +90,8 @@ def retrieve_word_graph(ascending_order, size,
     for i, line in enumerate(retrieve_data(file_name)):
         if i >= 4:
             colon_index = line.find(":")
-            word_graph[Word(line[:colon_index])] = {
-                Word(word) for word 
+            word_graph[intern_word(line[:colon_index])] = {
+                intern_word(word) for word 
                 in line.strip()[colon_index+3:-2].split(", ")}
 
     return word_graph
@@ -158,13 +158,15 @@ def retrieve_word_subgraphs(ascending_order, size, subgraph_type,
                 subgraph_class = line[:-1]
         if (line.startswith("(") or line.startswith("[")):
             if sorted_:
-                square = tuple(Word(word, ascending_order=ascending_order, 
-                                    optimize=ascending_order) 
+                square = tuple(intern_word(word, 
+                                           ascending_order=ascending_order, 
+                                           optimize=ascending_order) 
                                for word in line[2:-2].split("', '"))
                 subgraphs[subgraph_class].append(square)
             else:
-                subgraph = tuple(Word(word, ascending_order=ascending_order, 
-                                      optimize=ascending_order)
+                subgraph = tuple(intern_word(word, 
+                                             ascending_order=ascending_order, 
+                                             optimize=ascending_order)
                                  for word in line[2:-2].split("', '"))
                 subgraphs.append(subgraph)
 
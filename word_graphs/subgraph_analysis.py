@@ -13,6 +13,7 @@ from itertools import product
 
 from word_explorer.objects import Word, GeneralizedPattern
 from word_explorer.operations.reduction_flipping import get_deletions
+from word_explorer.operations.neighborhoods import NeighborhoodCache
 from .io import retrieve_word_subgraphs
 
 
@@ -29,7 +30,12 @@ def extract_directed_edges(square, directed_structure):
     return edges
 
 
-def classify_square(square, directed_structure):
+def classify_square(square, directed_structure, neighborhood_cache=None):
+    """
+    If neighborhood_cache, an instance of NeighborhoodCache, is given, 
+    the deletions of the words of square are looked up in it, so that 
+    words shared by many squares are only reduced once.
+    """
     edges = extract_directed_edges(square, directed_structure)
     repeat_pattern = GeneralizedPattern(
         (("a", ""), ("a", "")), name="repeat_pattern")
@@ -40,8 +46,14 @@ def classify_square(square, directed_structure):
         edge_classification = [0, False, False]
         insertion_length = len(edge[1]) - len(edge[0])
         edge_classification[0] = insertion_length
-        repeat_deletions = get_deletions(edge[1], repeat_pattern)
-        return_deletions = get_deletions(edge[1], return_pattern)
+        if neighborhood_cache is None:
+            repeat_deletions = get_deletions(edge[1], repeat_pattern)
+            return_deletions = get_deletions(edge[1], return_pattern)
+        else:
+            repeat_deletions = neighborhood_cache.get_deletions(
+                edge[1], repeat_pattern)
+            return_deletions = neighborhood_cache.get_deletions(
+                edge[1], return_pattern)
         if edge[0] in repeat_deletions:
             edge_classification[1] = True
         if edge[0] in return_deletions:
@@ -51,12 +63,20 @@ def classify_square(square, directed_structure):
     return tuple(classification)
 
 
-def classify_squares(sorted_squares):
+def classify_squares(sorted_squares, neighborhood_cache=None):
+    """
+    Classifies each square (see classify_square), sharing deletions 
+    between squares through neighborhood_cache, or through a new 
+    in-memory instance of NeighborhoodCache if None.
+    """
+    if neighborhood_cache is None:
+        neighborhood_cache = NeighborhoodCache()
     classified_squares = {}
     for directed_structure in sorted_squares:
         classifications = set()
         for square in sorted_squares[directed_structure]:
-            classification = classify_square(square, directed_structure)
+            classification = classify_square(
+                square, directed_structure, neighborhood_cache)
             classifications.add(classification)
         classified_squares[directed_structure] = classifications
 
@@ -9,9 +9,15 @@ Classes:
 
 from time import time
 
+import numpy as np
+
 from word_explorer.objects.io import retrieve_words
-from word_explorer.operations.insertions import generate_insertions
-from word_explorer.objects.ascending_order import convert_to_ascending_order
+from word_explorer.objects.compact import WordArray
+from word_explorer.objects import intern_word
+from word_explorer.operations.insertions import (generate_insertions, 
+                                                 generate_insertions_array)
+from word_explorer.objects.ascending_order import (
+    convert_to_ascending_order, convert_word_array_to_ascending_order)
 from .word_graphs_gpu import find_adjacent_vertices as find_adjacent_vertices_gpu
 from .io import get_word_graph_filename, store_word_graph
 
@@ -49,17 +55,28 @@ RETURN_WORD_AO = (
 
 
 class WordGraph:
+    """
+    The vertices can be given either as a list of instances of Word
+    or as an instance of WordArray; in the latter case, instances of Word 
+    are only constructed as needed while computing the neighborhoods.
+
+    If ascending_order = True, the neighborhoods are computed for 
+    chunk_size vertices at a time using array operations 
+    (see generate_insertions_array).
+    """
 
     def __init__(self, word_list, size_limit=None, 
-                 ascending_order=False, use_gpu=False):
+                 ascending_order=False, use_gpu=False, 
+                 name_base="word_graph_size", chunk_size=4096):
         self.vertices = word_list
         self.size_limit = size_limit
         self.use_gpu = use_gpu
+        self.chunk_size = chunk_size
         self.ascending_order = ascending_order
         self.directed_neighborhoods = self.compute_neighborhoods()
         if self.ascending_order:
             self.directed_neighborhoods = convert_to_ascending_order(
-                self.directed_neighborhoods)
+                self.directed_neighborhoods, in_place=True)
 
         self.vertex_count = len(self.vertices)
         self.edge_count = 0
@@ -67,29 +84,85 @@ class WordGraph:
             self.edge_count += len(self.directed_neighborhoods[vertex])
 
         self.file_name = get_word_graph_filename(
-            self.ascending_order, self.size_limit)
+            self.ascending_order, self.size_limit, name_base)
+
+    def iterate_vertices(self):
+        if isinstance(self.vertices, WordArray):
+            return self.vertices.words(ascending_order=self.ascending_order, 
+                                       optimize=True)
+        else:
+            return iter(self.vertices)
+
+    def to_word_array(self):
+        """Returns the vertices as an instance of WordArray."""
+        if isinstance(self.vertices, WordArray):
+            return self.vertices
+        else:
+            return WordArray.from_words(self.vertices)
 
     def compute_neighborhoods(self):
         neighborhoods = {}
         if self.use_gpu:
+                vertices = list(self.iterate_vertices())
                 neighbors_list = find_adjacent_vertices_gpu(
-                    self.vertices, self.size_limit, self.ascending_order)
-                for word, neighbors in zip(self.vertices, neighbors_list):
+                    vertices, self.size_limit, self.ascending_order)
+                for word, neighbors in zip(vertices, neighbors_list):
+                    neighborhoods[word] = neighbors
+        elif self.ascending_order:
+            word_array = self.to_word_array()
+            for start in range(0, len(word_array), self.chunk_size):
+                chunk = word_array[start:start+self.chunk_size]
+                neighbors_list = self.find_adjacent_vertices_array(chunk)
+                for word, neighbors in zip(chunk.words(
+                        ascending_order=True, optimize=True), neighbors_list):
                     neighborhoods[word] = neighbors
         else:
-            for word in self.vertices:
+            for word in self.iterate_vertices():
                 neighbors = self.find_adjacent_vertices(word)
                 neighborhoods[word] = neighbors
 
         return neighborhoods
 
+    def find_adjacent_vertices_array(self, word_array):
+        """
+        Args:
+            word_array: Instance of WordArray, containing words 
+                in ascending order.
+        Returns:
+            A list containing the set of neighbors of each word of 
+            word_array, computed with generate_insertions_array and 
+            converted to ascending order.
+        """
+        neighbors_list = [set() for i in range(len(word_array))]
+        for pattern_instance in REPEAT_WORD_AO + RETURN_WORD_AO:
+            instance_size = (len(pattern_instance) - 3) // 2
+            if self.size_limit is not None:
+                rows = np.flatnonzero(
+                    word_array.sizes + instance_size <= self.size_limit)
+            else:
+                rows = np.arange(len(word_array))
+            insertions, source_rows, _ = generate_insertions_array(
+                word_array[rows], pattern_instance, self.size_limit)
+            insertions = convert_word_array_to_ascending_order(
+                insertions, in_place=True)
+            for insertion, row in zip(insertions.strings(), rows[source_rows]):
+                neighbors_list[row].add(intern_word(
+                    insertion, double_occurrence=False, 
+                    ascending_order=True, optimize=True))
+
+        return neighbors_list
+
     def find_adjacent_vertices(self, word):
+        if self.ascending_order and not self.use_gpu:
+            return self.find_adjacent_vertices_array(
+                WordArray.from_words([word]))[0]
         neighbors = set()
         patterns = (REPEAT_WORD + RETURN_WORD if not self.ascending_order 
                     else REPEAT_WORD_AO + RETURN_WORD_AO)
         for pattern_instance in patterns:
             if len(word)//2 + (len(pattern_instance) - 3)//2 <= self.size_limit:
-                some_neighbors = self.generate_insertions(word, pattern_instance)
+                some_neighbors, _ = self.generate_insertions(
+                    word, pattern_instance)
                 neighbors |= some_neighbors
 
         return neighbors